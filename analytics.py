@@ -0,0 +1,197 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from history import HISTORY_FILE, USERS_FILE, REMINDERS, ACTIONS, RECORD, load_users
+
+CACHE_FILE = "history_daily.npz"
+# A water/meal message closed within this many seconds counts as dismissed
+# without being acted on
+QUICK_DISMISS_SECONDS = 3.0
+
+EVENT_DTYPE = np.dtype([("ts", "<f8"), ("user", "<u4"), ("reminder", "u1"), ("action", "u1"),
+                        ("pad", "V2"), ("value", "<f4")])
+assert EVENT_DTYPE.itemsize == RECORD.size
+
+# Aggregate key layout (int64): day | user (20 bits) | reminder (4) | action (4)
+_USER_BITS = 20
+_SHIFT_DAY = _USER_BITS + 8
+
+
+def _encode(day, user, reminder, action):
+    return ((day.astype(np.int64) << _SHIFT_DAY) | (user.astype(np.int64) << 8)
+            | (reminder.astype(np.int64) << 4) | action.astype(np.int64))
+
+
+def _decode(keys):
+    return (keys >> _SHIFT_DAY, (keys >> 8) & ((1 << _USER_BITS) - 1), (keys >> 4) & 15, keys & 15)
+
+
+def local_days(ts):
+    # Local calendar day number (days since 1970-01-01) for each timestamp.
+    # The UTC offset is looked up once per hour of the covered range (exact
+    # across DST changes; a few thousand lookups per year of history) and
+    # then applied with a single gather.
+    if len(ts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    hours = np.floor_divide(ts, 3600).astype(np.int64)
+    first = int(hours.min())
+    span = range(first, int(hours.max()) + 1)
+    offsets = np.array([time.localtime(h * 3600).tm_gmtoff for h in span], dtype=np.float64)
+    return np.floor_divide(ts + offsets[hours - first], 86400).astype(np.int64)
+
+
+def _group(keys, *columns):
+    # Sorted distinct keys plus the per-key sum of each column. Done with one
+    # argsort and reduceat, which is several times faster than np.unique
+    # with return_inverse on millions of rows.
+    if len(keys) == 0:
+        return (keys,) + tuple(column[:0] for column in columns)
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return (keys[starts],) + tuple(np.add.reduceat(column[order], starts) for column in columns)
+
+
+class Aggregates:
+    # Daily counts per (day, user, reminder, action), kept as sorted key /
+    # value columns and updated incrementally: a watermark records how many
+    # events of history.bin are already folded in, so update() only reads the
+    # tail (memory-mapped, no parsing). The aggregates and watermark are
+    # cached in history_daily.npz so a restart does not rescan either.
+    # Weekly figures are rolled up from the daily ones.
+    def __init__(self, directory):
+        self.path = os.path.join(directory, HISTORY_FILE)
+        self.users_path = os.path.join(directory, USERS_FILE)
+        self.cache_path = os.path.join(directory, CACHE_FILE)
+        self._reset()
+        self._load_cache()
+
+    def _reset(self):
+        self.watermark = 0
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.quick = np.zeros(0, dtype=np.int64) # dismissals under QUICK_DISMISS_SECONDS
+        self.value_sum = np.zeros(0, dtype=np.float64)
+
+    def update(self, save=True):
+        # Folds in events appended since the last update; returns how many
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        total = size // EVENT_DTYPE.itemsize
+        if total < self.watermark:
+            # History was truncated or replaced: start over
+            self._reset()
+        new = total - self.watermark
+        if new <= 0:
+            return 0
+        events = np.memmap(self.path, dtype=EVENT_DTYPE, mode="r", offset=self.watermark * EVENT_DTYPE.itemsize,
+                           shape=(new,))
+        keys = _encode(local_days(events["ts"]), events["user"], events["reminder"], events["action"])
+        quick = (events["action"] == ACTIONS.index("dismiss")) & (events["value"] < QUICK_DISMISS_SECONDS)
+        self._merge(keys, np.ones(new, dtype=np.int64), quick.astype(np.int64), events["value"].astype(np.float64))
+        del events
+        self.watermark = total
+        if save:
+            self._save_cache()
+        return new
+
+    def _merge(self, keys, counts, quick, value_sum):
+        # Keys are day-major and history is appended in time order, so new
+        # events only overlap the last few days of the existing aggregates:
+        # regroup that suffix together with the batch and keep the prefix.
+        split = np.searchsorted(self.keys, keys.min())
+        grouped = _group(np.concatenate((self.keys[split:], keys)),
+                         np.concatenate((self.counts[split:], counts)),
+                         np.concatenate((self.quick[split:], quick)),
+                         np.concatenate((self.value_sum[split:], value_sum)))
+        self.keys, self.counts, self.quick, self.value_sum = (
+            np.concatenate((old[:split], new))
+            for old, new in zip((self.keys, self.counts, self.quick, self.value_sum), grouped))
+
+    def _since(self, since_day):
+        # Keys are day-major, so a date range is a contiguous slice
+        start = 0 if since_day is None else np.searchsorted(self.keys, np.int64(since_day) << _SHIFT_DAY)
+        return slice(start, None)
+
+    def table(self, period="day", user=None, since_day=None):
+        # Structured array of (start_day, user, reminder, action, count, quick,
+        # value_sum) rows; period "week" groups Monday-to-Sunday
+        rows = self._since(since_day)
+        day, users, reminder, action = _decode(self.keys[rows])
+        counts, quick, value_sum = self.counts[rows], self.quick[rows], self.value_sum[rows]
+        if user is not None:
+            mask = users == self.user_id(user)
+            day, users, reminder, action = day[mask], users[mask], reminder[mask], action[mask]
+            counts, quick, value_sum = counts[mask], quick[mask], value_sum[mask]
+        if period == "week":
+            # Day 0 (1970-01-01) was a Thursday
+            day = (day + 3) // 7 * 7 - 3
+            keys, counts, quick, value_sum = _group(_encode(day, users, reminder, action), counts, quick, value_sum)
+            day, users, reminder, action = _decode(keys)
+        elif period != "day":
+            raise ValueError(f"Unknown period {period!r}")
+        rows = np.empty(len(day), dtype=[("start_day", "<i8"), ("user", "<u4"), ("reminder", "u1"),
+                                         ("action", "u1"), ("count", "<i8"), ("quick", "<i8"),
+                                         ("value_sum", "<f8")])
+        rows["start_day"], rows["user"], rows["reminder"], rows["action"] = day, users, reminder, action
+        rows["count"], rows["quick"], rows["value_sum"] = counts, quick, value_sum
+        return rows
+
+    def adherence(self, user=None, since_day=None):
+        # Break take/snooze rates and quick-dismiss rates for water and meals
+        rows = self._since(since_day)
+        _, users, reminder, action = _decode(self.keys[rows])
+        counts, quick_counts = self.counts[rows], self.quick[rows]
+        mask = np.ones(len(users), dtype=bool) if user is None else users == self.user_id(user)
+
+        def total(reminder_name, action_name, column=counts):
+            selected = mask & (reminder == REMINDERS.index(reminder_name)) & (action == ACTIONS.index(action_name))
+            return int(column[selected].sum())
+
+        prompts = total("break", "fire")
+        started = total("break", "start")
+        stats = {
+            "break_prompts": prompts,
+            "breaks_started": started,
+            "breaks_snoozed": total("break", "snooze"),
+            "breaks_cancelled": total("break", "cancel"),
+            "break_take_rate": started / prompts if prompts else 0.0,
+        }
+        for name in ("water", "meal"):
+            fired = total(name, "fire")
+            quick = total(name, "dismiss", quick_counts)
+            stats[f"{name}_reminders"] = fired
+            stats[f"{name}_quick_dismissals"] = quick
+            stats[f"{name}_quick_dismiss_rate"] = quick / fired if fired else 0.0
+        return stats
+
+    def user_id(self, name):
+        users = load_users(self.users_path)
+        return users.index(name) if name in users else -1
+
+    def _load_cache(self):
+        try:
+            with np.load(self.cache_path) as cache:
+                self.watermark = int(cache["watermark"])
+                self.keys, self.counts = cache["keys"], cache["counts"]
+                self.quick, self.value_sum = cache["quick"], cache["value_sum"]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def _save_cache(self):
+        # A unique temp file, so two updates racing each other never write
+        # the same one; whichever replaces the cache last wins
+        fd, tmp_path = tempfile.mkstemp(prefix=CACHE_FILE + ".", suffix=".tmp", dir=os.path.dirname(self.cache_path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, watermark=self.watermark, keys=self.keys, counts=self.counts,
+                         quick=self.quick, value_sum=self.value_sum)
+            os.replace(tmp_path, self.cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
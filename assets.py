@@ -0,0 +1,83 @@
+import logging
+import os
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.icon_cache')
+MAX_PHOTOS = 8
+
+
+class IconCache:
+    # Decodes and resizes each icon once per (path, size, mtime).
+    # Scaled variants are persisted as small PNGs in CACHE_DIR so a cold start
+    # skips the LANCZOS resize of the 1024px sources as well, and the Tk
+    # PhotoImages are kept in a bounded LRU so repeated reminders reuse them.
+    def __init__(self, max_photos=MAX_PHOTOS, cache_dir=CACHE_DIR):
+        self.max_photos = max_photos
+        self.cache_dir = cache_dir
+        self._photos = OrderedDict()
+
+    def get(self, path, size):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            log.warning("Icon path does not exist: %s", path)
+            return None
+        key = (os.path.abspath(path), size, mtime_ns)
+        photo = self._photos.get(key)
+        if photo is not None:
+            self._photos.move_to_end(key)
+            return photo
+        try:
+            from PIL import ImageTk # deferred: PIL is only needed once an icon is shown
+            photo = ImageTk.PhotoImage(self._load_scaled(key))
+        except Exception as e:
+            log.warning("Error loading icon %s: %s", path, e)
+            return None
+        # A new mtime replaces the stale entry for the same icon/size
+        for stale in [k for k in self._photos if k[:2] == key[:2]]:
+            del self._photos[stale]
+        self._photos[key] = photo
+        while len(self._photos) > self.max_photos:
+            self._photos.popitem(last=False)
+        return photo
+
+    def warm(self, paths, size):
+        for path in paths:
+            self.get(path, size)
+
+    def _variant_path(self, key):
+        import hashlib
+        path, (width, height), mtime_ns = key
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{digest}-{width}x{height}-{mtime_ns}.png")
+
+    def _load_scaled(self, key):
+        from PIL import Image
+        variant = self._variant_path(key)
+        try:
+            with Image.open(variant) as cached:
+                cached.load()
+                return cached
+        except OSError:
+            pass
+        path, size, _ = key
+        with Image.open(path) as source:
+            img = source.resize(size, Image.Resampling.LANCZOS)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Drop variants scaled from an older version of this icon
+            prefix = os.path.basename(variant).rsplit("-", 1)[0] + "-"
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix):
+                    os.remove(os.path.join(self.cache_dir, name))
+            tmp_path = variant + ".tmp"
+            img.save(tmp_path, format="PNG")
+            os.replace(tmp_path, variant)
+        except OSError as e:
+            log.warning("Could not cache scaled icon %s: %s", path, e)
+        return img
+
+
+icon_cache = IconCache()
@@ -0,0 +1,256 @@
+import logging
+import os
+import sys
+import threading
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+APP_NAME = "HealthReminderApp"
+DISPLAY_NAME = "Health Reminder"
+
+# One tray menu entry; `action` None makes a plain label
+TrayItem = namedtuple("TrayItem", "text action enabled checked", defaults=(True, None))
+
+
+def _launch_command():
+    # Command that starts this app again (used for autostart)
+    script_path = os.path.abspath(sys.argv[0])
+    # For python scripts, we need to run it with pythonw.exe to avoid terminal window
+    python_exe = sys.executable
+    if python_exe.lower().endswith("python.exe"):
+        python_exe = python_exe[:-len("python.exe")] + "pythonw.exe"
+    return f'"{python_exe}" "{script_path}"'
+
+
+class PlatformBackend:
+    # OS integration used by the app: autostart, sounds, native notifications
+    # and the tray icon. Platform modules (winreg, winsound, plyer, pystray)
+    # are imported on first use, never at startup.
+    name = "generic"
+
+    def is_autostart_enabled(self):
+        return False
+
+    def set_autostart(self, enabled=True):
+        return False
+
+    def load_sound(self):
+        # Platform handle for the reminder sound, resolved once and passed
+        # back to play_sound(); None if there is nothing to preload
+        return None
+
+    def play_sound(self, handle=None):
+        pass
+
+    def notify(self, title, message):
+        from plyer import notification
+        notification.notify(
+            title=title,
+            message=message,
+            app_name=DISPLAY_NAME,
+            timeout=10
+        )
+
+    def create_tray(self, name, title, image, items):
+        import pystray
+        menu = pystray.Menu(*[
+            pystray.MenuItem(item.text, item.action or (lambda: None), enabled=item.enabled, checked=item.checked)
+            for item in items
+        ])
+        return pystray.Icon(name, image, title, menu)
+
+
+class WindowsBackend(PlatformBackend):
+    name = "windows"
+    RUN_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
+
+    def is_autostart_enabled(self):
+        import winreg
+        try:
+            reg_key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.RUN_KEY, 0, winreg.KEY_READ)
+            winreg.QueryValueEx(reg_key, APP_NAME)
+            winreg.CloseKey(reg_key)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception:
+            return False
+
+    def set_autostart(self, enabled=True):
+        import winreg
+        try:
+            reg_key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.RUN_KEY, 0, winreg.KEY_SET_VALUE)
+            if enabled:
+                winreg.SetValueEx(reg_key, APP_NAME, 0, winreg.REG_SZ, _launch_command())
+            else:
+                try:
+                    winreg.DeleteValue(reg_key, APP_NAME)
+                except FileNotFoundError:
+                    pass
+            winreg.CloseKey(reg_key)
+            return True
+        except Exception as e:
+            log.error("Error setting autostart: %s", e)
+            return False
+
+    SOUND_KEY = r"AppEvents\Schemes\Apps\.Default\SystemAsterisk\.Current"
+
+    def load_sound(self):
+        # The .wav behind the SystemAsterisk alias, read into memory once
+        import winreg
+        try:
+            reg_key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.SOUND_KEY, 0, winreg.KEY_READ)
+            path = winreg.QueryValueEx(reg_key, "")[0]
+            winreg.CloseKey(reg_key)
+            with open(os.path.expandvars(path), "rb") as f:
+                return f.read()
+        except Exception:
+            return None
+
+    def play_sound(self, handle=None):
+        import winsound
+        try:
+            if handle:
+                # SND_MEMORY can't be combined with SND_ASYNC; this runs on a
+                # dispatcher worker, so blocking until the sound ends is fine
+                winsound.PlaySound(handle, winsound.SND_MEMORY)
+            else:
+                winsound.PlaySound("SystemAsterisk", winsound.SND_ALIAS | winsound.SND_ASYNC)
+        except Exception:
+            pass
+
+
+class XdgBackend(PlatformBackend):
+    # Linux and other freedesktop.org desktops
+    name = "xdg"
+    SOUND_FILE = "/usr/share/sounds/freedesktop/stereo/message.oga"
+
+    def __init__(self, config_home=None):
+        config_home = config_home or os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+        self.desktop_file = os.path.join(config_home, "autostart", f"{APP_NAME}.desktop")
+
+    def is_autostart_enabled(self):
+        # Desktop settings tools disable an entry in place rather than deleting it
+        try:
+            with open(self.desktop_file) as f:
+                entries = dict(line.strip().split("=", 1) for line in f if "=" in line)
+        except OSError:
+            return False
+        return (entries.get("Hidden", "false").lower() != "true"
+                and entries.get("X-GNOME-Autostart-enabled", "true").lower() != "false")
+
+    def set_autostart(self, enabled=True):
+        try:
+            if enabled:
+                os.makedirs(os.path.dirname(self.desktop_file), exist_ok=True)
+                tmp_path = self.desktop_file + ".tmp"
+                with open(tmp_path, "w") as f:
+                    f.write("[Desktop Entry]\n"
+                            "Type=Application\n"
+                            f"Name={DISPLAY_NAME}\n"
+                            f"Exec={_launch_command()}\n"
+                            f"Path={os.path.dirname(os.path.abspath(sys.argv[0]))}\n"
+                            "X-GNOME-Autostart-enabled=true\n")
+                os.replace(tmp_path, self.desktop_file)
+            elif os.path.exists(self.desktop_file):
+                os.remove(self.desktop_file)
+            return True
+        except OSError as e:
+            log.error("Error setting autostart: %s", e)
+            return False
+
+    def load_sound(self):
+        # The player command, so PATH is only searched once
+        import shutil
+        if shutil.which("canberra-gtk-play"):
+            return ["canberra-gtk-play", "--id=message"]
+        if shutil.which("paplay") and os.path.exists(self.SOUND_FILE):
+            return ["paplay", self.SOUND_FILE]
+        return None
+
+    def play_sound(self, handle=None):
+        import subprocess
+        cmd = handle or self.load_sound()
+        if not cmd:
+            return
+        # Fire and forget; never wait on the player
+        try:
+            subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            pass
+
+    def notify(self, title, message):
+        import shutil, subprocess
+        if shutil.which("notify-send"):
+            subprocess.Popen(["notify-send", "--app-name", DISPLAY_NAME, title, message],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            super().notify(title, message)
+
+
+class AutostartService:
+    # Caches the autostart state so callers (e.g. every tray menu render)
+    # never wait on the registry or filesystem. The cache is filled by
+    # refresh(), updated by our own set() calls, and re-read only by the
+    # optional low-frequency background refresh.
+    REFRESH_SECONDS = 15 * 60
+
+    def __init__(self, backend, refresh_seconds=REFRESH_SECONDS):
+        self.backend = backend
+        self.refresh_seconds = refresh_seconds
+        self._enabled = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def enabled(self):
+        # Cached value; False until the first refresh() has completed
+        return bool(self._enabled)
+
+    def current(self):
+        # Cached value, or one OS query if nothing is cached yet; for user
+        # actions that must not act on the False placeholder
+        if self._enabled is None:
+            return self.refresh()
+        return self._enabled
+
+    def refresh(self):
+        enabled = self.backend.is_autostart_enabled()
+        with self._lock:
+            self._enabled = enabled
+        return enabled
+
+    def set(self, enabled):
+        with self._lock:
+            ok = self.backend.set_autostart(enabled)
+            if ok:
+                self._enabled = enabled
+        return ok
+
+    def sync(self, wanted):
+        # Make the OS state match the config, querying it only once
+        if self.refresh() != wanted:
+            self.set(wanted)
+
+    def start_refresh(self):
+        def loop():
+            while not self._stop.wait(self.refresh_seconds):
+                self.refresh()
+        threading.Thread(target=loop, name="AutostartRefresh", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if sys.platform == "win32":
+            _backend = WindowsBackend()
+        elif sys.platform == "darwin":
+            _backend = PlatformBackend()
+        else:
+            _backend = XdgBackend()
+    return _backend
@@ -0,0 +1,751 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from engine import ReminderEngine, BREAK_DUE
+from settings import ConfigSnapshot
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def random_config(rng):
+    meals = sorted({f"{rng.randint(7, 21):02d}:{rng.choice((0, 10, 15, 30, 45)):02d}" for _ in range(3)})
+    return ConfigSnapshot({
+        "pomodoro": {"work_minutes": rng.choice((20, 25, 30, 50)), "break_minutes": rng.choice((5, 10)), "enabled": True},
+        "water": {"interval_minutes": rng.randint(20, 60), "enabled": True},
+        "meals": {"timings": meals, "enabled": True},
+        "auto_start": False,
+    })
+
+
+def _engine_schedules(count, seed, start):
+    rng = random.Random(seed)
+    engine = ReminderEngine()
+    for i in range(count):
+        # Stagger start times over the first 20 minutes so schedules don't
+        # all fire on the same tick
+        engine.add_schedule(i, random_config(rng), start + rng.uniform(0, 1200))
+    return engine, rng
+
+
+def _answer_breaks(engine, rng, batch, now):
+    for event in batch:
+        if event.kind == BREAK_DUE:
+            # Users mostly take the break, sometimes snooze it
+            if rng.random() < 0.8:
+                engine.start_break(event.schedule, now)
+            else:
+                engine.remind_later(event.schedule, now)
+
+
+def bench_engine(args):
+    # Replays `--hours` of simulated time against N schedules, with the simulated
+    # clock running `--speed` times faster than real time. Lateness is how far
+    # behind that accelerated clock an event was emitted, in real milliseconds.
+    # That paced run's events/s is just the offered load, so the same hours
+    # are then replayed unpaced, polling each deadline as soon as the last
+    # batch is done: its events/s is the sustained maximum.
+    print(f"{'schedules':>10} {'events':>9} {'wall s':>8} {'events/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'max events/s':>13}")
+    for count in args.schedules:
+        start = time.time()
+        engine, rng = _engine_schedules(count, args.seed, start)
+        end = start + args.hours * 3600
+        lateness = []
+        events = 0
+        t0 = time.perf_counter()
+        while True:
+            sim_now = start + (time.perf_counter() - t0) * args.speed
+            if sim_now >= end:
+                break
+            next_deadline = engine.next_deadline()
+            if next_deadline is None or next_deadline > end:
+                break
+            if next_deadline > sim_now:
+                time.sleep((next_deadline - sim_now) / args.speed)
+                continue
+            batch = engine.poll(sim_now)
+            events += len(batch)
+            for event in batch:
+                lateness.append((sim_now - event.deadline) / args.speed * 1000)
+            _answer_breaks(engine, rng, batch, sim_now)
+        wall = time.perf_counter() - t0
+        lateness.sort()
+
+        engine, rng = _engine_schedules(count, args.seed, start)
+        unpaced_events = 0
+        t0 = time.perf_counter()
+        while True:
+            deadline = engine.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            batch = engine.poll(deadline)
+            unpaced_events += len(batch)
+            _answer_breaks(engine, rng, batch, deadline)
+        unpaced_wall = time.perf_counter() - t0
+        print(f"{count:>10} {events:>9} {wall:>8.2f} {events / wall:>10.0f} "
+              f"{percentile(lateness, 50):>8.2f} {percentile(lateness, 99):>8.2f} {percentile(lateness, 100):>8.2f} "
+              f"{unpaced_events / unpaced_wall:>13.0f}")
+
+
+def random_rules(rng, count):
+    rules = []
+    for i in range(count):
+        if rng.random() < 0.5:
+            rules.append({"name": f"rule{i}", "every_minutes": rng.randint(5, 240), "title": f"Rule {i}"})
+        else:
+            minute = rng.randint(0, 59)
+            hours = f"{rng.randint(6, 11)}-{rng.randint(12, 22)}/{rng.randint(1, 3)}"
+            rules.append({"name": f"rule{i}", "cron": f"{minute} {hours} * * {rng.choice(('*', '1-5', '0,6'))}",
+                          "title": f"Rule {i}"})
+    return rules
+
+
+def bench_rules(args):
+    # One schedule with thousands of custom rules: compile time, the cost of
+    # an idle tick (nothing due) and of each rule firing over a simulated day
+    print(f"{'rules':>7} {'compile ms':>11} {'idle poll us':>13} {'fires':>7} {'us/fire':>8}")
+    for count in args.rules:
+        rng = random.Random(args.seed)
+        raw = {"rules": random_rules(rng, count)}
+        t = time.perf_counter()
+        config = ConfigSnapshot(raw)
+        compile_ms = (time.perf_counter() - t) * 1000
+
+        engine = ReminderEngine()
+        now = datetime(2026, 1, 5, 8, 0).timestamp()
+        engine.add_schedule("default", config, now)
+        polls = 10000
+        t = time.perf_counter()
+        for i in range(polls):
+            engine.poll(now + i * 1e-6)
+        idle_us = (time.perf_counter() - t) / polls * 1e6
+
+        end = now + 86400
+        fires = 0
+        t = time.perf_counter()
+        while True:
+            deadline = engine.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            fires += len(engine.poll(deadline))
+        fire_us = (time.perf_counter() - t) / max(fires, 1) * 1e6
+        print(f"{count:>7} {compile_ms:>11.1f} {idle_us:>13.2f} {fires:>7} {fire_us:>8.1f}")
+
+
+def bench_overlays(args):
+    # Needs a display. Cycles water/meal/break overlays through the pooled
+    # windows and checks that the widget count stays flat.
+    import tkinter as tk
+    from utils import OverlayManager, count_widgets
+
+    root = tk.Tk()
+    root.withdraw()
+    overlays = OverlayManager(root, on_start_break=lambda: None, on_remind_later=lambda: None,
+                              on_cancel_break=lambda: None, break_icon_path="break_icon.png")
+    widgets_before = count_widgets(root)
+    for i in range(args.count):
+        overlays.show_message("Water Reminder", "Time to drink some water!", icon_path="water_icon.png")
+        # Same-minute meal: queued behind the water overlay, not stacked on it
+        overlays.show_message("Meal Time", "Time for your scheduled meal.", icon_path="meal_icon.png")
+        root.update()
+        overlays.message.hide()
+        root.update()
+        overlays.message.hide()
+        overlays.show_break_confirmation()
+        overlays.break_confirm.hide()
+        overlays.show_break()
+        overlays.close_break()
+        root.update()
+    stats = overlays.stats()
+    root.destroy()
+    print(f"shown={stats['shown']} coalesced={stats['coalesced']} "
+          f"show latency p50={stats['show_latency_ms_p50']:.2f} ms max={stats['show_latency_ms_max']:.2f} ms")
+    print(f"widgets before={widgets_before} after={stats['widgets']}")
+
+
+def bench_sim(args):
+    # Replays a simulated week of the real HealthReminderApp loop on a
+    # VirtualClock with headless widgets: pomodoro cycles, water, meals, users
+    # snoozing/cancelling breaks and a config edit per day.
+    from clock import VirtualClock
+    from headless import HeadlessUI
+    from main import HealthReminderApp
+
+    rng = random.Random(args.seed)
+    clock = VirtualClock(datetime(2026, 1, 5, 8, 0).timestamp()) # a Monday morning
+    config = ConfigSnapshot({
+        "pomodoro": {"work_minutes": 25, "break_minutes": 5, "enabled": True},
+        "water": {"interval_minutes": 45, "enabled": True},
+        "meals": {"timings": ["09:10", "13:30", "20:10"], "enabled": True},
+        "auto_start": False,
+    })
+
+    tracemalloc.start()
+    app = HealthReminderApp(clock=clock, ui=HeadlessUI(clock), config=config)
+    root = app.root
+    lateness = []
+    fired = Counter()
+    handle_event = app.handle_event
+
+    def record(event):
+        fired[event.kind] += 1
+        lateness.append((event.fired_at - event.deadline) * 1000)
+        handle_event(event)
+    app.handle_event = record
+
+    def respond(prompt):
+        # The "user" answers the break prompt after a while: mostly takes the
+        # break (and sometimes cancels it early), sometimes snoozes it
+        def answer():
+            if rng.random() < 0.75:
+                prompt.start_break()
+                if rng.random() < 0.1:
+                    root.after(rng.randint(30, 200) * 1000, app.overlays.break_overlay.cancel)
+            else:
+                prompt.remind_later()
+        root.after(rng.randint(2, 90) * 1000, answer)
+    app.overlays.break_confirm.responder = respond
+
+    def edit_config(day):
+        data = app.config.to_dict()
+        data["water"]["interval_minutes"] = 40 if day % 2 else 45
+        app.reload_config(ConfigSnapshot(data))
+
+    start = clock.time()
+    end = start + args.days * 86400
+    for day in range(int(args.days)):
+        root.after(int((day * 86400 + rng.uniform(3600, 36000)) * 1000), edit_config, day)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.tick()
+        root.run_until(end)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    hours = (end - start) / 3600
+    lateness.sort()
+    print(f"simulated {hours:.0f} h in {wall:.2f} s wall")
+    print(f"events: {dict(fired)}")
+    print(f"cpu per simulated hour: {cpu / hours * 1000:.2f} ms")
+    print(f"wakeups per simulated hour: {root.wakeups / hours:.1f}")
+    print(f"firing lateness ms: p50={percentile(lateness, 50):.2f} p99={percentile(lateness, 99):.2f} max={percentile(lateness, 100):.2f}")
+    print(f"peak traced memory: {peak / 1024:.1f} KiB")
+    from metrics import TICK_SECONDS
+    print(f"tick duration (histogram bucket): p50<={TICK_SECONDS.quantile(0.5) * 1000:g} ms "
+          f"p99<={TICK_SECONDS.quantile(0.99) * 1000:g} ms over {TICK_SECONDS.count()} ticks")
+
+
+def bench_restore(args):
+    # Crash/restart simulation on a VirtualClock: the app runs for a while,
+    # "crashes" (records not yet group-committed are lost, no clean close),
+    # stays down for a random time and is restored from snapshot + journal.
+    # Reports restore time and checks that no meal reminder fires twice.
+    import tempfile
+    from clock import VirtualClock
+    from headless import HeadlessUI
+    from main import HealthReminderApp
+    from persist import StateStore
+
+    rng = random.Random(args.seed)
+    clock = VirtualClock(datetime(2026, 1, 5, 8, 0).timestamp())
+    config = ConfigSnapshot({
+        "pomodoro": {"work_minutes": 25, "break_minutes": 5, "enabled": True},
+        "water": {"interval_minutes": 45, "enabled": True},
+        "meals": {"timings": ["09:10", "13:30", "20:10"], "enabled": True},
+        "auto_start": False,
+    })
+    directory = tempfile.mkdtemp(prefix="health_reminder_restore_")
+    restore_times = []
+    meal_deadlines = Counter()
+    fired = Counter()
+    store = None
+    commits = compactions = 0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.restarts):
+            store = StateStore(directory, clock=clock)
+            start = time.perf_counter()
+            app = HealthReminderApp(clock=clock, ui=HeadlessUI(clock), config=config, state_store=store)
+            restore_times.append(time.perf_counter() - start)
+            root = app.root
+            handle_event = app.handle_event
+
+            def record(event, handle_event=handle_event):
+                fired[event.kind] += 1
+                if event.kind == "meal":
+                    meal_deadlines[event.deadline] += 1
+                handle_event(event)
+            app.handle_event = record
+
+            def respond(prompt, root=root):
+                root.after(rng.randint(2, 90) * 1000, prompt.start_break)
+            app.overlays.break_confirm.responder = respond
+
+            def writer(root=root, store=store):
+                # Stands in for the writer thread: one group commit per simulated second
+                store.flush()
+                root.after(1000, writer)
+            root.after(1000, writer)
+
+            app.tick()
+            root.run_until(clock.time() + rng.uniform(600, 4 * 3600))
+            clock.advance(rng.uniform(5, 3 * 3600)) # crashed: down for a while
+            commits += store.commits
+            compactions += store.compactions
+    store.close()
+    shutil.rmtree(directory)
+
+    restore_times.sort()
+    duplicates = sum(count - 1 for count in meal_deadlines.values() if count > 1)
+    print(f"{args.restarts} crash/restart cycles, events: {dict(fired)}")
+    print(f"restore (construct app from snapshot + journal): p50={percentile(restore_times, 50) * 1000:.2f} ms "
+          f"max={percentile(restore_times, 100) * 1000:.2f} ms")
+    print(f"journal group commits={commits} compactions={compactions}")
+    print(f"meal reminders fired twice: {duplicates}")
+
+
+TIME_JUMP_CONFIG = {
+    "pomodoro": {"work_minutes": 25, "break_minutes": 5, "enabled": True},
+    "water": {"interval_minutes": 45, "enabled": True},
+    "meals": {"timings": ["09:10", "13:30", "20:10"], "enabled": True},
+    "rules": [{"name": "stretch", "cron": "0 * * * *", "title": "Stretch"}],
+    "auto_start": False,
+}
+
+
+def _jump_app(clock, policy, detect=True, meals=None, wall_timers=False):
+    # Headless app whose break prompts are answered after 10 s; returns the
+    # app and a list collecting (steady time, kind or message title)
+    from headless import HeadlessUI
+    from main import HealthReminderApp
+
+    data = dict(TIME_JUMP_CONFIG, catch_up=policy)
+    if meals is not None:
+        data["meals"] = {"timings": meals, "enabled": True}
+    app = HealthReminderApp(clock=clock, ui=HeadlessUI(clock, wall_timers), config=ConfigSnapshot(data))
+    if not detect:
+        app.time_jumps.check = lambda: None # behaves like before resume detection
+    seen = []
+    handle_event, show_message = app.handle_event, app.overlays.show_message
+
+    def record(event):
+        seen.append((clock.monotonic(), event.kind, event))
+        handle_event(event)
+
+    def message(title, *args, **kwargs):
+        if title == "Welcome Back":
+            seen.append((clock.monotonic(), "summary", None))
+        show_message(title, *args, **kwargs)
+    app.handle_event, app.overlays.show_message = record, message
+    app.overlays.break_confirm.responder = lambda prompt: app.root.after(10000, prompt.start_break)
+    return app, seen
+
+
+def bench_timejumps(args):
+    # Suspend/resume, wall-clock steps and DST days on a VirtualClock. For
+    # each catch-up policy (and with detection turned off, as before it
+    # existed): what fires in the minutes after waking, whether a pomodoro
+    # block still lasts its length in elapsed time across a step, and that
+    # meals fire once per day across DST changes. test_app.py checks the
+    # same scenarios; this prints what happens, with the old behaviour for
+    # comparison.
+    import logging
+    from clock import VirtualClock
+
+    logging.disable(logging.WARNING) # the app logs every detected jump
+    start = datetime(2026, 1, 5, 10, 50).timestamp() # a Monday
+    policies = ("collapse", "skip", "fire_once")
+    print("suspend (asleep from 10:50), reminders in the 5 min after waking:")
+    print(f"  {'asleep':>7} {'policy':<10} {'fired':<48} {'burst':>5}")
+    for hours in args.suspend_hours:
+        for policy in (None,) + policies:
+            clock = VirtualClock(start)
+            app, seen = _jump_app(clock, policy or "collapse", detect=policy is not None)
+            app.tick()
+            app.root.run_until(clock.time() + 60)
+            clock.suspend(hours * 3600)
+            woke = clock.monotonic()
+            app.root.run_until(clock.time() + 300)
+            after = Counter(kind for t, kind, event in seen if t >= woke)
+            burst = max(Counter((kind, event.rule) for t, kind, event in seen if t >= woke and event).values(),
+                        default=0)
+            print(f"  {hours:>6g}h {policy or '(none)':<10} {str(dict(after)):<48} {burst:>5}")
+
+    print("wall clock stepped 5 min into a work block; break prompt after (elapsed):")
+    for step in args.steps:
+        for detect in (False, True):
+            clock = VirtualClock(start)
+            app, seen = _jump_app(clock, "collapse", detect=detect)
+            began = clock.monotonic()
+            app.tick()
+            app.root.run_until(clock.time() + 300)
+            clock.step(step * 60)
+            app.root.run_until(clock.time() + 3600)
+            due = next((t for t, kind, event in seen if kind == "break_due"), None)
+            after = f"{(due - began) / 60:.1f} min" if due is not None else "never"
+            print(f"  step {step:+g} min, detection {'on ' if detect else 'off'}: {after} "
+                  f"(configured 25); events in the hour: {len(seen)}")
+
+    # Tk 8.6 keys `after` on the wall clock, so setting it back stalls the
+    # pending tick. The loop runs in 5 s slices here, each followed by what
+    # the watchdog thread does (main.WATCHDOG_SECONDS).
+    print("same with Tcl 8.6 wall-clock timers, step -60 min; break prompt after (elapsed):")
+    for watchdog in (False, True):
+        clock = VirtualClock(start)
+        app, seen = _jump_app(clock, "collapse", wall_timers=True)
+        began = clock.monotonic()
+        app.tick()
+        app.root.run_until(clock.time() + 300)
+        clock.step(-3600)
+        for _ in range(720):
+            app.root.run_until(clock.time() + 5)
+            if watchdog and app.tick_overdue():
+                app.wake()
+        due = next((t for t, kind, event in seen if kind == "break_due"), None)
+        after = f"{(due - began) / 60:.1f} min" if due is not None else "never"
+        print(f"  watchdog {'on ' if watchdog else 'off'}: {after} (configured 25)")
+
+    if not hasattr(time, "tzset"):
+        print("DST check skipped (time.tzset not available)")
+        logging.disable(logging.NOTSET)
+        return
+    saved_tz = os.environ.get("TZ")
+    os.environ["TZ"] = args.tz
+    time.tzset()
+    try:
+        print(f"meals at 01:30, 02:30 and 13:00 across DST changes in {args.tz}:")
+        for day in ((2026, 3, 7), (2026, 10, 31)):
+            clock = VirtualClock(datetime(*day, 12, 0).timestamp())
+            app, seen = _jump_app(clock, "collapse", meals=["01:30", "02:30", "13:00"])
+            app.tick()
+            app.root.run_until(clock.time() + 3 * 86400 - 1800) # ends clear of a meal time
+            fires = Counter((time.strftime("%m-%d", time.localtime(event.deadline)), event.detail)
+                            for t, kind, event in seen if kind == "meal")
+            wall = [time.strftime("%m-%d %H:%M %Z", time.localtime(event.fired_at))
+                    for t, kind, event in seen if kind == "meal"]
+            print(f"  from {day[1]:02d}-{day[2]:02d}: {len(wall)} meal reminders, "
+                  f"max per day and time {max(fires.values())}: {', '.join(wall)}")
+    finally:
+        if saved_tz is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = saved_tz
+        time.tzset()
+        logging.disable(logging.NOTSET)
+
+
+def bench_history(args):
+    # Synthetic multi-year, multi-user history written straight to the binary
+    # format: time a cold aggregate build, an incremental update with one more
+    # day of events, a cached reload and the queries the tray uses
+    import tempfile
+    import numpy as np
+    from analytics import Aggregates, EVENT_DTYPE
+    from history import HISTORY_FILE, USERS_FILE, REMINDERS, ACTIONS
+
+    rng = np.random.default_rng(args.seed)
+    directory = tempfile.mkdtemp(prefix="health_reminder_history_")
+    with open(os.path.join(directory, USERS_FILE), "w") as f:
+        json.dump([f"user{i}" for i in range(args.users)], f)
+    start = datetime(2026, 1, 5).timestamp() - args.years * 365 * 86400
+    days = int(args.years * 365)
+
+    def events(first_day, n_days):
+        n = args.users * n_days * args.per_day
+        rows = np.zeros(n, dtype=EVENT_DTYPE)
+        rows["ts"] = start + first_day * 86400 + np.sort(rng.uniform(0, n_days * 86400, n))
+        rows["user"] = rng.integers(0, args.users, n)
+        rows["reminder"] = rng.integers(0, len(REMINDERS), n)
+        rows["action"] = rng.integers(0, len(ACTIONS), n)
+        rows["value"] = rng.exponential(5.0, n)
+        return rows
+
+    path = os.path.join(directory, HISTORY_FILE)
+    events(0, days).tofile(path)
+    size = os.path.getsize(path)
+
+    t = time.perf_counter()
+    aggregates = Aggregates(directory)
+    count = aggregates.update(save=False)
+    cold = time.perf_counter() - t
+
+    with open(path, "ab") as f:
+        events(days, 1).tofile(f)
+    t = time.perf_counter()
+    tail = aggregates.update(save=False)
+    incremental = time.perf_counter() - t
+    t = time.perf_counter()
+    aggregates._save_cache()
+    save = time.perf_counter() - t
+    aggregates._save_cache()
+
+    t = time.perf_counter()
+    reloaded = Aggregates(directory)
+    reloaded.update()
+    cached = time.perf_counter() - t
+
+    today = int(start // 86400) + days
+    t = time.perf_counter()
+    stats = reloaded.adherence("user0", since_day=today - 7)
+    recent = reloaded.table("week", since_day=today - 28)
+    query = time.perf_counter() - t
+    t = time.perf_counter()
+    weekly = reloaded.table("week")
+    rollup = time.perf_counter() - t
+    shutil.rmtree(directory)
+
+    print(f"{count} events ({size / 1e6:.0f} MB), {args.users} users, {args.years:g} years")
+    print(f"cold build: {cold * 1000:.0f} ms; +{tail} events incremental: {incremental * 1000:.1f} ms; "
+          f"cache save: {save * 1000:.0f} ms; reload from cache: {cached * 1000:.1f} ms")
+    print(f"7-day adherence + 4-week table ({len(recent)} rows): {query * 1000:.1f} ms; "
+          f"full weekly rollup of {len(reloaded.keys)} daily rows into {len(weekly)}: {rollup * 1000:.0f} ms")
+    print(f"user0 last 7 days: {stats}")
+
+
+def bench_commands(args):
+    # Needs a display. Posts commands from a background thread (as the tray
+    # does) into a running Tk loop and reports post-to-effect latency.
+    import threading
+    import tkinter as tk
+    from commands import CommandChannel
+
+    root = tk.Tk()
+    root.withdraw()
+    channel = CommandChannel(root)
+    done = threading.Event()
+
+    def tray_thread():
+        for i in range(args.count):
+            channel.post(lambda: None)
+            time.sleep(args.interval)
+        channel.post(root.quit)
+        done.set()
+
+    threading.Thread(target=tray_thread, daemon=True).start()
+    root.mainloop()
+    done.wait()
+    stats = channel.stats()
+    root.destroy()
+    print(f"commands={stats['executed']} post-to-effect latency "
+          f"p50={stats['latency_ms_p50']:.2f} ms max={stats['latency_ms_max']:.2f} ms")
+
+
+def bench_control(args):
+    # Round trips through the control API to a headless app: batches from a
+    # client thread (the Tk loop is polled every 0.2 ms, so that bounds the
+    # hop onto the Tk thread), then cold `hrctl.py state` processes
+    import tempfile
+    import threading
+    from clock import VirtualClock
+    from control import ControlClient
+    from headless import HeadlessUI
+    from main import HealthReminderApp
+
+    clock = VirtualClock(time.time())
+    app = HealthReminderApp(clock=clock, ui=HeadlessUI(clock))
+    directory = tempfile.mkdtemp()
+    app.assets_dir = directory
+    app.start_control()
+    address = app.control_server.address
+    app.tick()
+    samples = []
+    cli_samples = []
+
+    def client():
+        batch = [{"cmd": "state"}] * args.batch
+        with ControlClient(address) as c:
+            for _ in range(args.count):
+                t = time.perf_counter()
+                c.request(batch)
+                samples.append((time.perf_counter() - t) * 1000)
+        here = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+        # Point the CLI at this app's socket instead of the one next to main.py
+        script = f"import sys, hrctl; hrctl.control_address = lambda d: {address!r}; " \
+                 f"sys.exit(hrctl.main(['state']))"
+        for _ in range(args.runs):
+            t = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", script], cwd=here, env=env, capture_output=True)
+            cli_samples.append((time.perf_counter() - t) * 1000)
+            if result.returncode:
+                print(f"hrctl.py failed: {result.stderr.decode().strip()}")
+                break
+        app.commands.post(app.quit)
+
+    threading.Thread(target=client, daemon=True).start()
+    while not app.root.destroyed:
+        app.root.run_until(time.time())
+        time.sleep(0.0002)
+    shutil.rmtree(directory, ignore_errors=True)
+    samples.sort()
+    print(f"{args.count} batches of {args.batch}: round trip p50={percentile(samples, 50):.2f} ms "
+          f"p99={percentile(samples, 99):.2f} ms")
+    print(f"hrctl.py state, fresh process ({args.runs} runs): median={statistics.median(cli_samples):.1f} ms")
+
+
+def bench_autostart(args):
+    # Cost of the XDG autostart check the tray menu used to make on every
+    # render against AutostartService's cached value, in a throwaway config
+    # home (runs on any OS)
+    import tempfile
+    from backends import XdgBackend, AutostartService
+
+    config_home = tempfile.mkdtemp(prefix="health_reminder_xdg_")
+    try:
+        backend = XdgBackend(config_home)
+        service = AutostartService(backend)
+        backend.set_autostart(True)
+        service.refresh()
+        t = time.perf_counter()
+        for _ in range(args.count):
+            backend.is_autostart_enabled()
+        check_us = (time.perf_counter() - t) / args.count * 1e6
+        t = time.perf_counter()
+        for _ in range(args.count):
+            service.enabled()
+        cached_us = (time.perf_counter() - t) / args.count * 1e6
+    finally:
+        shutil.rmtree(config_home, ignore_errors=True)
+    print(f"is_autostart_enabled: {check_us:.1f} us per check; AutostartService.enabled (cached): {cached_us:.2f} us")
+
+
+FIRST_TICK_SCRIPT = """
+import sys
+from main import HealthReminderApp
+if sys.argv[1] == "headless":
+    from clock import SystemClock
+    from headless import HeadlessUI
+    app = HealthReminderApp(ui=HeadlessUI(SystemClock()))
+else:
+    app = HealthReminderApp()
+app.tick()
+print("FIRST_TICK", flush=True)
+"""
+
+
+def bench_startup(args):
+    # Cold-process startup: -X importtime breakdown of `import main`, then the
+    # time from spawning the interpreter to the first reminder tick
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=here, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.rstrip()[1:]))
+    total = max((us for us, name in rows if name == "main"), default=0)
+    rows.sort(reverse=True)
+    print(f"import main: {total / 1000:.1f} ms cumulative; slowest modules (indented = nested):")
+    for us, name in rows[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    samples = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        child = subprocess.Popen([sys.executable, "-c", FIRST_TICK_SCRIPT, args.ui], cwd=here,
+                                 stdout=subprocess.PIPE, text=True)
+        for line in child.stdout:
+            if line.strip() == "FIRST_TICK":
+                samples.append(time.perf_counter() - start)
+                break
+        child.kill()
+        child.wait()
+    if samples:
+        print(f"time to first tick ({args.ui}, {len(samples)} runs): "
+              f"median={statistics.median(samples) * 1000:.1f} ms min={min(samples) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Health Reminder benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    engine_parser = sub.add_parser("engine", help="multi-schedule engine throughput and firing lateness")
+    engine_parser.add_argument("--schedules", type=int, nargs="+", default=[10000, 100000])
+    engine_parser.add_argument("--hours", type=float, default=1.0, help="simulated hours to replay")
+    engine_parser.add_argument("--speed", type=float, default=100.0, help="simulated seconds per real second")
+    engine_parser.add_argument("--seed", type=int, default=1)
+    engine_parser.set_defaults(func=bench_engine)
+
+    overlays_parser = sub.add_parser("overlays", help="overlay show latency and widget count (needs a display)")
+    overlays_parser.add_argument("--count", type=int, default=200, help="reminder cycles to run")
+    overlays_parser.set_defaults(func=bench_overlays)
+
+    sim_parser = sub.add_parser("sim", help="headless simulated week of the app loop on a virtual clock")
+    sim_parser.add_argument("--days", type=float, default=7.0)
+    sim_parser.add_argument("--seed", type=int, default=1)
+    sim_parser.set_defaults(func=bench_sim)
+
+    restore_parser = sub.add_parser("restore", help="crash/restart cycles restored from the state journal (headless)")
+    restore_parser.add_argument("--restarts", type=int, default=50)
+    restore_parser.add_argument("--seed", type=int, default=1)
+    restore_parser.set_defaults(func=bench_restore)
+
+    history_parser = sub.add_parser("history", help="reminder history analytics over synthetic multi-year data")
+    history_parser.add_argument("--users", type=int, default=100)
+    history_parser.add_argument("--years", type=float, default=3.0)
+    history_parser.add_argument("--per-day", type=int, default=30, help="events per user per day")
+    history_parser.add_argument("--seed", type=int, default=1)
+    history_parser.set_defaults(func=bench_history)
+
+    rules_parser = sub.add_parser("rules", help="compile/tick/fire cost of thousands of custom rules")
+    rules_parser.add_argument("--rules", type=int, nargs="+", default=[100, 1000, 10000])
+    rules_parser.add_argument("--seed", type=int, default=1)
+    rules_parser.set_defaults(func=bench_rules)
+
+    jumps_parser = sub.add_parser("timejumps", help="suspend/resume, clock steps and DST days on a virtual clock")
+    jumps_parser.add_argument("--suspend-hours", type=float, nargs="+", default=[0.25, 3, 14])
+    jumps_parser.add_argument("--steps", type=float, nargs="+", default=[60, -60], help="wall clock steps in minutes")
+    jumps_parser.add_argument("--tz", default="America/New_York", help="time zone for the DST check")
+    jumps_parser.set_defaults(func=bench_timejumps)
+
+    autostart_parser = sub.add_parser("autostart", help="XDG autostart entry checks and check cost (any OS)")
+    autostart_parser.add_argument("--count", type=int, default=10000, help="state checks to time")
+    autostart_parser.set_defaults(func=bench_autostart)
+
+    startup_parser = sub.add_parser("startup", help="import time and time-to-first-tick of a fresh process")
+    startup_parser.add_argument("--ui", choices=("headless", "tk"), default="headless",
+                                help="tk measures the real UI and needs a display")
+    startup_parser.add_argument("--runs", type=int, default=5)
+    startup_parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    startup_parser.set_defaults(func=bench_startup)
+
+    commands_parser = sub.add_parser("commands", help="tray-thread to Tk command latency (needs a display)")
+    commands_parser.add_argument("--count", type=int, default=500)
+    commands_parser.add_argument("--interval", type=float, default=0.005, help="seconds between posts")
+    commands_parser.set_defaults(func=bench_commands)
+
+    control_parser = sub.add_parser("control", help="control API round trips and CLI startup (headless)")
+    control_parser.add_argument("--count", type=int, default=1000, help="batches to send")
+    control_parser.add_argument("--batch", type=int, default=5, help="commands per batch")
+    control_parser.add_argument("--runs", type=int, default=10, help="hrctl.py processes to time")
+    control_parser.set_defaults(func=bench_control)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# Between two loop wakeups, the wall clock moving this much more (or less)
+# than the steady clock counts as a clock step (NTP, the user changing it)
+STEP_THRESHOLD_SECONDS = 2.0
+# Waking this much later than the loop asked for counts as a resume from
+# suspend (or the process having been stopped)
+RESUME_THRESHOLD_SECONDS = 30.0
+
+# The steady clock keeps counting while the machine sleeps, so a suspend
+# shows up as a late wakeup rather than a clock step: CLOCK_BOOTTIME on
+# Linux, CLOCK_MONOTONIC on macOS (unlike time.monotonic() there). Elsewhere
+# it is time.monotonic(); where that stops during sleep, a suspend is seen
+# as a forward step and interval timers simply stand still for it.
+if sys.platform.startswith("linux") and hasattr(time, "CLOCK_BOOTTIME"):
+    def steady_time():
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+elif sys.platform == "darwin":
+    def steady_time():
+        return time.clock_gettime(time.CLOCK_MONOTONIC)
+else:
+    steady_time = time.monotonic
+
+# step: seconds the wall clock jumped on top of the time that really passed
+# suspended: seconds the loop woke up later than planned
+TimeJump = namedtuple("TimeJump", "step suspended")
+
+
+class SystemClock:
+    # The real wall clock. Everything in the app asks a clock for the time
+    # instead of calling time.time() directly, so simulations can swap in
+    # VirtualClock. monotonic() is the steady clock used to measure elapsed
+    # time and to spot suspends and clock steps.
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return steady_time()
+
+    def now(self):
+        return datetime.fromtimestamp(self.time())
+
+
+class VirtualClock(SystemClock):
+    # Manually advanced clock for simulations and benchmarks. suspend() and
+    # step() reproduce a laptop sleeping and the wall clock being reset.
+    def __init__(self, start=None):
+        self._now = time.time() if start is None else start
+        self._steady = 0.0
+
+    def time(self):
+        return self._now
+
+    def monotonic(self):
+        return self._steady
+
+    def advance(self, seconds):
+        self._now += seconds
+        self._steady += seconds
+
+    def advance_to(self, t):
+        if t > self._now:
+            self.advance(t - self._now)
+
+    def suspend(self, seconds):
+        # Both clocks move on, but nothing ran meanwhile: timers that came
+        # due while asleep all fire late on the next run_until()
+        self.advance(seconds)
+
+    def step(self, seconds):
+        # Wall clock set forward (or back, if negative); no time passes
+        self._now += seconds
+
+
+class TimeJumpDetector:
+    # Compares wall and steady clock progress between loop wakeups. The loop
+    # calls expect(delay) when it goes to sleep and check() when it wakes;
+    # check() returns a TimeJump when the wall clock was stepped or the
+    # wakeup came much later than asked for (the machine was suspended).
+    def __init__(self, clock, step_threshold=STEP_THRESHOLD_SECONDS, resume_threshold=RESUME_THRESHOLD_SECONDS):
+        self.clock = clock
+        self.step_threshold = step_threshold
+        self.resume_threshold = resume_threshold
+        self._wall = None
+        self._steady = None
+        self._due = None
+
+    def expect(self, delay):
+        self._due = self.clock.monotonic() + delay
+
+    def overdue(self, grace):
+        # True when the wakeup asked for with expect() is more than `grace`
+        # seconds late by the steady clock (safe to call from another thread)
+        due = self._due
+        return due is not None and self.clock.monotonic() - due > grace
+
+    def until_overdue(self, grace):
+        # Seconds until overdue(grace) turns true (0 once it has), or None
+        # while no wakeup is expected (the loop is mid-tick)
+        due = self._due
+        if due is None:
+            return None
+        return max(0.0, due + grace - self.clock.monotonic())
+
+    def check(self):
+        wall, steady = self.clock.time(), self.clock.monotonic()
+        step = suspended = 0.0
+        if self._wall is not None:
+            drift = (wall - self._wall) - (steady - self._steady)
+            if abs(drift) >= self.step_threshold:
+                step = drift
+        if self._due is not None and steady - self._due >= self.resume_threshold:
+            suspended = steady - self._due
+        self._wall, self._steady, self._due = wall, steady, None
+        if step or suspended:
+            return TimeJump(step, suspended)
+        return None
@@ -0,0 +1,57 @@
+import logging
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+COMMAND_EVENT = "<<HealthReminderCommand>>"
+
+
+class CommandChannel:
+    # The only way other threads (tray, watcher, IPC) change app state: they
+    # post() a callable and the Tk thread runs it. deque append/popleft are
+    # atomic, so posting takes no lock; the Tk loop is woken with a virtual
+    # event instead of polling, and only when no wakeup is already pending.
+    def __init__(self, root):
+        self.root = root
+        self._queue = deque()
+        self._wakeup_pending = False
+        self.posted = 0
+        self.executed = 0
+        self.latency = deque(maxlen=256) # seconds from post() to the command running
+        root.bind(COMMAND_EVENT, self.drain)
+
+    def post(self, func, *args):
+        self._queue.append((func, args, time.perf_counter()))
+        self.posted += 1
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+            try:
+                self.root.event_generate(COMMAND_EVENT, when="tail")
+            except Exception:
+                # Tk already shut down (or refused the event): let the next
+                # post try again instead of waiting on a wakeup that never comes
+                self._wakeup_pending = False
+
+    def drain(self, event=None):
+        # Runs on the Tk thread. Clear the flag before popping so a command
+        # posted while we drain always gets its own wakeup.
+        self._wakeup_pending = False
+        while self._queue:
+            func, args, posted_at = self._queue.popleft()
+            self.latency.append(time.perf_counter() - posted_at)
+            self.executed += 1
+            try:
+                func(*args)
+            except Exception:
+                log.exception("Error running command %s", getattr(func, '__name__', func))
+
+    def stats(self):
+        latencies = sorted(self.latency)
+        return {
+            "pending": len(self._queue),
+            "posted": self.posted,
+            "executed": self.executed,
+            "latency_ms_p50": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "latency_ms_max": latencies[-1] * 1000 if latencies else 0.0,
+        }
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+SOCKET_FILE = "control.sock"
+PIPE_NAME = r"\\.\pipe\HealthReminder-{user}"
+# Largest request a client may send; a batch is a handful of small objects
+MAX_REQUEST_BYTES = 64 * 1024
+# How long a connection waits for the Tk thread to run its batch
+REPLY_TIMEOUT_SECONDS = 5.0
+
+# Command name -> names of its arguments, in the order the CLI takes them
+COMMANDS = {
+    "state": (),
+    "snooze": (),
+    "start_break": (),
+    "skip_break": (),
+    "pause": ("minutes",),
+    "resume": (),
+    "reload": (),
+}
+
+
+def control_address(directory):
+    # A Unix socket next to the app's state files (only the owner can reach
+    # it), or a per-user named pipe on Windows
+    if sys.platform == "win32":
+        return PIPE_NAME.format(user=os.environ.get("USERNAME", "default"))
+    return os.path.join(directory, SOCKET_FILE)
+
+
+class ControlServer:
+    # Local control API. A client sends one JSON message: a list of commands
+    # such as {"cmd": "pause", "minutes": 30}. The whole list is handed to
+    # `handle` (on the connection's thread), which returns one reply dict per
+    # command; the replies go back as one JSON list. Framing is
+    # multiprocessing.connection's, so any Python client can use Client().
+    def __init__(self, address, handle):
+        # multiprocessing.connection costs ~50 ms to import; keep it off the
+        # startup path (this is created from start_background)
+        from multiprocessing.connection import Client, Listener
+        self.address = address
+        self.handle = handle
+        self._client = Client
+        self._stopping = False
+        if sys.platform != "win32" and os.path.exists(address):
+            self._remove_stale(address)
+        self.listener = Listener(address)
+        if sys.platform != "win32":
+            os.chmod(address, 0o600)
+        self.connections = 0
+
+    def _remove_stale(self, address):
+        # A socket file left by a crash: if nothing answers on it, replace it
+        try:
+            self._client(address).close()
+        except OSError:
+            os.unlink(address)
+            return
+        raise OSError(f"another instance is listening on {address}")
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name="ControlServer", daemon=True).start()
+
+    def stop(self):
+        self._stopping = True
+        try:
+            # accept() doesn't notice the listener closing; wake it up
+            self._client(self.address).close()
+        except OSError:
+            pass
+        self.listener.close()
+
+    def _accept_loop(self):
+        while not self._stopping:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                if self._stopping:
+                    return
+                log.exception("Control connection failed")
+                continue
+            if self._stopping:
+                conn.close()
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), name="ControlConnection", daemon=True).start()
+
+    def _serve(self, conn):
+        # A client may send several batches over one connection
+        with conn:
+            while True:
+                try:
+                    data = conn.recv_bytes(MAX_REQUEST_BYTES)
+                except (EOFError, OSError):
+                    return
+                try:
+                    requests = json.loads(data)
+                    if isinstance(requests, dict):
+                        requests = [requests]
+                    if not isinstance(requests, list):
+                        raise ValueError("expected a command object or a list of them")
+                    replies = self.handle(requests)
+                except ValueError as e:
+                    replies = [{"ok": False, "error": f"bad request: {e}"}]
+                try:
+                    conn.send_bytes(json.dumps(replies).encode("utf-8"))
+                except OSError:
+                    return
+
+
+class ControlClient:
+    # Client side of ControlServer. On Unix the framing (a 4-byte big-endian
+    # length, then the payload) is spoken over a plain socket, so a CLI call
+    # does not pay for importing multiprocessing; on Windows named pipes go
+    # through multiprocessing.connection.Client.
+    def __init__(self, address, timeout=REPLY_TIMEOUT_SECONDS + 1):
+        if sys.platform == "win32":
+            from multiprocessing.connection import Client
+            self._conn = Client(address)
+            self._sock = None
+        else:
+            import socket
+            self._conn = None
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            try:
+                self._sock.connect(address)
+            except OSError:
+                self._sock.close()
+                raise
+
+    def request(self, commands):
+        data = json.dumps(commands).encode("utf-8")
+        if self._conn is not None:
+            self._conn.send_bytes(data)
+            return json.loads(self._conn.recv_bytes())
+        self._sock.sendall(struct.pack("!i", len(data)) + data)
+        size, = struct.unpack("!i", self._recv_exact(4))
+        return json.loads(self._recv_exact(size))
+
+    def _recv_exact(self, size):
+        chunks = []
+        while size:
+            chunk = self._sock.recv(size)
+            if not chunk:
+                raise EOFError("connection closed by the reminder app")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+        else:
+            self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
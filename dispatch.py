@@ -0,0 +1,148 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from backends import get_backend
+
+log = logging.getLogger(__name__)
+
+WORKERS = 2
+MAX_PENDING = 32
+# Minimum seconds between two accepted requests with the same key on a
+# channel; repeats inside the window are dropped and counted (one beep or
+# toast per burst is enough). Different notifications are never held back.
+MIN_INTERVAL = {
+    "notify": 1.0,
+    "sound": 0.5,
+}
+
+
+class Dispatcher:
+    # Runs OS notification and sound calls on a small worker pool so neither
+    # the Tk loop nor the tray thread ever waits on them. The queue is bounded
+    # (overflow is dropped and counted), identical pending notifications are
+    # coalesced and repeats of the same request are rate limited.
+    def __init__(self, backend=None, workers=WORKERS, max_pending=MAX_PENDING, min_interval=MIN_INTERVAL):
+        self._backend = backend
+        self.workers = workers
+        self.min_interval = dict(min_interval)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._last_accepted = {}
+        self._threads = []
+        self._sound = None
+        self._sound_loaded = False
+
+        self.submitted = 0
+        self.dispatched = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.latency = deque(maxlen=256) # seconds from submit to the OS call returning
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    def notify(self, title, message):
+        return self.submit("notify", self.backend.notify, (title, message), key=("notify", title, message))
+
+    def play_sound(self):
+        return self.submit("sound", self._play_sound, (), key=("sound",))
+
+    def preload_sound(self):
+        # Resolve the sound once (off the Tk thread) so playing it is cheap
+        return self.submit("preload", self._load_sound, ())
+
+    def submit(self, channel, func, args, key=None):
+        now = time.perf_counter()
+        with self._lock:
+            if key is not None and key in self._pending:
+                self.coalesced += 1
+                return False
+            interval = self.min_interval.get(channel)
+            limit_key = (channel, key)
+            if interval and now - self._last_accepted.get(limit_key, -interval) < interval:
+                self.rate_limited += 1
+                return False
+            try:
+                self._queue.put_nowait((func, args, key, now))
+            except queue.Full:
+                self.dropped += 1
+                return False
+            if interval:
+                self._last_accepted[limit_key] = now
+                if len(self._last_accepted) > self._queue.maxsize:
+                    # Forget keys whose window has passed
+                    longest = max(self.min_interval.values())
+                    self._last_accepted = {k: t for k, t in self._last_accepted.items() if now - t < longest}
+            if key is not None:
+                self._pending.add(key)
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+            if not self._threads:
+                self._start()
+        return True
+
+    def _start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"Dispatcher-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            func, args, key, submitted_at = item
+            with self._lock:
+                self._pending.discard(key)
+            try:
+                func(*args)
+            except Exception as e:
+                self.failed += 1
+                log.warning("Dispatch error in %s: %s", getattr(func, '__name__', func), e)
+            self.dispatched += 1
+            self.latency.append(time.perf_counter() - submitted_at)
+
+    def _load_sound(self):
+        if not self._sound_loaded:
+            self._sound = self.backend.load_sound()
+            self._sound_loaded = True
+        return self._sound
+
+    def _play_sound(self):
+        self.backend.play_sound(self._load_sound())
+
+    def stop(self):
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def stats(self):
+        latencies = sorted(self.latency)
+        return {
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "dispatched": self.dispatched,
+            "coalesced": self.coalesced,
+            "rate_limited": self.rate_limited,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "latency_ms_p50": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "latency_ms_p99": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        }
+
+
+dispatcher = Dispatcher()
@@ -0,0 +1,346 @@
+from collections import namedtuple
+
+from rules import WATER, MEAL, CUSTOM # re-exported: event kinds of the built-in/custom rules
+from scheduler import DeadlineScheduler
+
+# Pomodoro states
+WORK = "WORK"
+BREAK_PENDING = "BREAK_PENDING"
+BREAK = "BREAK"
+REMIND_LATER = "REMIND_LATER"
+
+REMIND_LATER_SECONDS = 5 * 60
+# When catching up (app restarted, machine resumed), a calendar reminder
+# (meals, cron rules) that was missed still fires if it is at most this old
+# (only the most recent one); older ones are dropped
+MEAL_GRACE_SECONDS = 60 * 60
+
+# Schedule fields that survive a restart (see persist.py). paused_until is
+# saved too but optional, since older saved states don't have it.
+PERSISTED_FIELDS = ("pomodoro_state", "pomodoro_start", "pomodoro_duration", "anchors")
+
+# Longest pause() accepted
+MAX_PAUSE_SECONDS = 24 * 60 * 60
+
+# Event kinds emitted by ReminderEngine.poll(); rule-driven reminders use
+# their rule's kind: rules.WATER, rules.MEAL or rules.CUSTOM
+BREAK_DUE = "break_due"  # work (or snooze) finished, waiting for start_break/remind_later
+WORK_DUE = "work_due"    # break finished, back to work
+
+# `detail` carries the rule's "HH:MM" label for calendar rules (meals,
+# cron), None otherwise; `rule` names the config rule that fired
+ReminderEvent = namedtuple("ReminderEvent", "schedule kind deadline fired_at detail rule", defaults=(None,))
+
+
+class Schedule:
+    # Reminder state for one user/profile. No UI, no clock: every method
+    # takes `now` so the engine can be driven by any time source.
+    __slots__ = (
+        "key", "config",
+        "pomodoro_state", "pomodoro_start", "pomodoro_duration",
+        "anchors", "upcoming", "paused_until",
+    )
+
+    def __init__(self, key, config, now):
+        # `config` is a settings.ConfigSnapshot
+        self.key = key
+        self.config = config
+        self.pomodoro_state = WORK
+        self.pomodoro_start = now
+        self.pomodoro_duration = config.work_seconds
+        # rule name -> time its next fire is computed from (the last fire).
+        # Calendar rules fire strictly after it, so a deadline that passed
+        # while the owner was busy still fires (late) instead of being skipped.
+        self.anchors = {rule.name: now for rule in config.rules}
+        # rule name -> (deadline, label) currently armed
+        self.upcoming = {}
+        # While set, nothing fires until this time (see ReminderEngine.pause)
+        self.paused_until = None
+
+    def remaining(self, now):
+        return max(0, self.pomodoro_duration - (now - self.pomodoro_start))
+
+    def state(self):
+        state = {name: getattr(self, name) for name in PERSISTED_FIELDS}
+        state["anchors"] = dict(self.anchors)
+        state["paused_until"] = self.paused_until
+        return state
+
+
+class ReminderEngine:
+    # Holds any number of independent schedules and a single deadline heap
+    # keyed by (schedule key, reminder kind). poll() only touches entries that
+    # are due, so a tick costs O(due * log n) regardless of how many
+    # schedules are registered.
+    def __init__(self):
+        self.schedules = {}
+        self.scheduler = DeadlineScheduler()
+        # Keys of schedules whose persisted state changed since take_dirty()
+        self.dirty = set()
+
+    def __len__(self):
+        return len(self.schedules)
+
+    def add_schedule(self, key, config, now):
+        schedule = Schedule(key, config, now)
+        self.schedules[key] = schedule
+        self._arm_pomodoro(schedule)
+        for rule in config.rules:
+            self._arm_rule(schedule, rule)
+        return schedule
+
+    def restore_schedule(self, key, config, state, now):
+        # Re-creates a schedule from Schedule.state(). Falls back to a fresh
+        # schedule if the saved state is unusable. Deadlines that passed
+        # while the app was down are left for the caller's catch_up().
+        schedule = Schedule(key, config, now)
+        try:
+            values = {name: state[name] for name in PERSISTED_FIELDS}
+            paused_until = state.get("paused_until")
+        except (KeyError, TypeError, AttributeError):
+            return self.add_schedule(key, config, now)
+        if values["pomodoro_state"] not in (WORK, BREAK_PENDING, BREAK, REMIND_LATER) \
+                or not isinstance(values["anchors"], dict) \
+                or not (paused_until is None or isinstance(paused_until, (int, float))):
+            return self.add_schedule(key, config, now)
+        for name in ("pomodoro_state", "pomodoro_start", "pomodoro_duration"):
+            setattr(schedule, name, values[name])
+        # Rules added to the config while the app was down start from now
+        for name, anchor in values["anchors"].items():
+            if name in schedule.anchors:
+                schedule.anchors[name] = anchor
+
+        self.schedules[key] = schedule
+        if paused_until is not None:
+            # Still paused: only the resume is armed. A pause that ran out
+            # while the app was down resumes now.
+            if paused_until > now:
+                self.pause(key, paused_until)
+            else:
+                self._resume(schedule, now)
+            return schedule
+        self._arm_pomodoro(schedule)
+        for rule in config.rules:
+            self._arm_rule(schedule, rule)
+        return schedule
+
+    def catch_up(self, key, now, away):
+        # The owner was away for `away` seconds up to `now`: the app was not
+        # running, the machine slept, or the wall clock jumped forward.
+        # Applies the schedule's catch-up policy (config.catch_up) to the
+        # deadlines that passed meanwhile, before the next poll sees them:
+        #   collapse: every missed reminder fires once, late. Of a calendar
+        #     rule only the latest missed time fires, and only if it is
+        #     under MEAL_GRACE_SECONDS old. A pomodoro block that ended at
+        #     least a break ago counts as the break: a fresh work block starts.
+        #   skip / fire_once: nothing missed fires and everything restarts
+        #     from now (fire_once leaves it to the caller to show one
+        #     summary instead).
+        # Returns the names of the missed reminders ("pomodoro" or rule names).
+        schedule = self.schedules[key]
+        if schedule.paused_until is not None:
+            return [] # resuming from the pause restarts everything anyway
+        config = schedule.config
+        collapse = config.catch_up == "collapse"
+        missed = []
+        if config.pomodoro_enabled and (schedule.pomodoro_state == BREAK_PENDING
+                                        or schedule.pomodoro_start + schedule.pomodoro_duration <= now):
+            missed.append("pomodoro")
+            if not collapse or away >= config.break_seconds:
+                self._enter(schedule, WORK, config.work_seconds, now)
+        for rule in config.rules:
+            upcoming = schedule.upcoming.get(rule.name)
+            if upcoming is None or upcoming[0] > now:
+                continue
+            missed.append(rule.name)
+            if not collapse:
+                schedule.anchors[rule.name] = now
+            elif rule.anchor_on_fire == "deadline":
+                self._skip_missed(schedule, rule, now)
+            else:
+                continue # a single deadline: it fires once, late
+            self._arm_rule(schedule, rule)
+        return missed
+
+    def clock_stepped(self, key, delta):
+        # The wall clock was set `delta` seconds forward (or back) without
+        # that time passing. Pomodoro blocks, interval rules and pauses
+        # measure elapsed time, so they move along and keep what was left of
+        # them; calendar rules stay on the wall clock (a forward step that
+        # skipped some is then handled by catch_up()).
+        schedule = self.schedules[key]
+        schedule.pomodoro_start += delta
+        self._arm_pomodoro(schedule)
+        for rule in schedule.config.rules:
+            if rule.anchor_on_fire == "fired":
+                schedule.anchors[rule.name] += delta
+                self._arm_rule(schedule, rule)
+        if schedule.paused_until is not None:
+            self.pause(key, schedule.paused_until + delta)
+
+    def _skip_missed(self, schedule, rule, now):
+        # Keep at most the latest missed fire, and only within the grace period
+        anchor = schedule.anchors[rule.name]
+        latest = None
+        nxt = rule.next_after(anchor)
+        while nxt is not None and nxt[0] <= now:
+            if latest is not None:
+                anchor = latest
+            latest = nxt[0]
+            nxt = rule.next_after(latest)
+        if latest is None:
+            return
+        schedule.anchors[rule.name] = anchor if now - latest <= MEAL_GRACE_SECONDS else now
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def remove_schedule(self, key):
+        schedule = self.schedules.pop(key, None)
+        self.dirty.discard(key)
+        self.scheduler.cancel((key, "pomodoro"))
+        self.scheduler.cancel((key, "resume"))
+        if schedule is not None:
+            for name in schedule.upcoming:
+                self.scheduler.cancel((key, name))
+
+    def update_config(self, key, config, now):
+        # Applies a new snapshot as a diff: only the deadlines of sections that
+        # actually changed are re-armed, running timers keep their start times.
+        # Returns the set of changed section names.
+        schedule = self.schedules[key]
+        old = schedule.config
+        changed = old.changed_sections(config)
+        schedule.config = config
+        if config.pomodoro_enabled and not old.pomodoro_enabled:
+            # Switched back on: a fresh work block, not the one that was
+            # running (and long overdue) when it was switched off
+            self._enter(schedule, WORK, config.work_seconds, now)
+        elif "pomodoro" in changed:
+            self._arm_pomodoro(schedule)
+        if changed & {"water", "meals", "rules"}:
+            # Only rules whose definition changed are touched. A modified rule
+            # keeps its anchor; a new (or re-enabled) one starts from now, so
+            # reminders that passed while it was switched off aren't replayed.
+            for name in old.rule_map.keys() | config.rule_map.keys():
+                rule = config.rule_map.get(name)
+                if rule == old.rule_map.get(name):
+                    continue
+                if rule is None:
+                    self._disarm_rule(schedule, name)
+                    continue
+                if name not in old.rule_map:
+                    schedule.anchors[name] = now
+                self._arm_rule(schedule, rule)
+        return changed
+
+    def next_deadline(self):
+        return self.scheduler.next_deadline()
+
+    def poll(self, now):
+        events = []
+        for (key, kind), deadline in self.scheduler.pop_due(now):
+            schedule = self.schedules.get(key)
+            if schedule is None:
+                continue
+            if kind == "pomodoro":
+                events.append(self._fire_pomodoro(schedule, deadline, now))
+                continue
+            if kind == "resume":
+                self._resume(schedule, now)
+                continue
+            rule = schedule.config.rule_map.get(kind)
+            if rule is None:
+                continue
+            label = schedule.upcoming[kind][1]
+            events.append(ReminderEvent(key, rule.kind, deadline, now, label, rule.name))
+            schedule.anchors[kind] = now if rule.anchor_on_fire == "fired" else deadline
+            self._arm_rule(schedule, rule)
+        return events
+
+    # --- Pomodoro actions (UI callbacks) ---
+    def start_break(self, key, now):
+        schedule = self.schedules[key]
+        self._enter(schedule, BREAK, schedule.config.break_seconds, now)
+
+    def remind_later(self, key, now):
+        self._enter(self.schedules[key], REMIND_LATER, REMIND_LATER_SECONDS, now)
+
+    def cancel_break(self, key, now):
+        schedule = self.schedules[key]
+        self._enter(schedule, WORK, schedule.config.work_seconds, now)
+
+    # --- Pausing ---
+    def pause(self, key, until):
+        # Nothing fires for this schedule until `until`; pausing again just
+        # moves the resume time
+        schedule = self.schedules[key]
+        schedule.paused_until = until
+        self.dirty.add(key)
+        self.scheduler.cancel((key, "pomodoro"))
+        for name in schedule.upcoming:
+            self.scheduler.cancel((key, name))
+        schedule.upcoming.clear()
+        self.scheduler.schedule((key, "resume"), until)
+
+    def resume(self, key, now):
+        self._resume(self.schedules[key], now)
+
+    def _resume(self, schedule, now):
+        # Reminders that fell inside the pause are not replayed: a fresh work
+        # block starts and every rule counts from now
+        schedule.paused_until = None
+        self.scheduler.cancel((schedule.key, "resume"))
+        for rule in schedule.config.rules:
+            schedule.anchors[rule.name] = now
+        self._enter(schedule, WORK, schedule.config.work_seconds, now)
+        for rule in schedule.config.rules:
+            self._arm_rule(schedule, rule)
+
+    def _enter(self, schedule, state, duration, now):
+        schedule.pomodoro_state = state
+        schedule.pomodoro_duration = duration
+        schedule.pomodoro_start = now
+        self._arm_pomodoro(schedule)
+
+    def _fire_pomodoro(self, schedule, deadline, now):
+        if schedule.pomodoro_state == BREAK:
+            self._enter(schedule, WORK, schedule.config.work_seconds, now)
+            return ReminderEvent(schedule.key, WORK_DUE, deadline, now, None)
+        schedule.pomodoro_state = BREAK_PENDING
+        self._arm_pomodoro(schedule)
+        return ReminderEvent(schedule.key, BREAK_DUE, deadline, now, None)
+
+    # Every persisted-state change re-arms a deadline, so the arm methods
+    # are where schedules get marked dirty
+    def _arm_pomodoro(self, schedule):
+        self.dirty.add(schedule.key)
+        key = (schedule.key, "pomodoro")
+        # BREAK_PENDING has no deadline: it waits for start_break/remind_later
+        if schedule.config.pomodoro_enabled and schedule.pomodoro_state != BREAK_PENDING \
+                and schedule.paused_until is None:
+            self.scheduler.schedule(key, schedule.pomodoro_start + schedule.pomodoro_duration)
+        else:
+            self.scheduler.cancel(key)
+
+    def _arm_rule(self, schedule, rule):
+        # One heap entry per (schedule, rule): however many rules there are,
+        # a tick only touches the ones that are due
+        self.dirty.add(schedule.key)
+        if schedule.paused_until is not None:
+            return # armed again on resume
+        nxt = rule.next_after(schedule.anchors[rule.name])
+        if nxt is None:
+            # Never fires again (e.g. a cron date that doesn't exist)
+            schedule.upcoming.pop(rule.name, None)
+            self.scheduler.cancel((schedule.key, rule.name))
+            return
+        schedule.upcoming[rule.name] = nxt
+        self.scheduler.schedule((schedule.key, rule.name), nxt[0])
+
+    def _disarm_rule(self, schedule, name):
+        self.dirty.add(schedule.key)
+        schedule.upcoming.pop(name, None)
+        schedule.anchors.pop(name, None)
+        self.scheduler.cancel((schedule.key, name))
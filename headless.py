@@ -0,0 +1,211 @@
+import heapq
+import itertools
+
+from utils import OverlayManager
+
+
+class HeadlessRoot:
+    # Stand-in for tk.Tk driven by a VirtualClock. after() callbacks go into a
+    # timer heap and run_until() executes them in order, jumping the clock
+    # forward between them instead of waiting. Timers run on the clock's
+    # steady time, so stepping the wall clock doesn't make them fire early
+    # or late; run_until() still takes a wall-clock end time. With
+    # wall_timers they run on the wall clock instead, like Tcl 8.6's `after`.
+    def __init__(self, clock, wall_timers=False):
+        self.clock = clock
+        self._timer_clock = clock.time if wall_timers else clock.monotonic
+        self._timers = []
+        self._cancelled = set()
+        self._ids = itertools.count(1)
+        self.wakeups = 0 # times the loop had to sleep until a later timer
+        self.callbacks = 0
+        self.destroyed = False
+        self._bindings = {}
+
+    def after(self, ms, func, *args):
+        timer_id = next(self._ids)
+        heapq.heappush(self._timers, (self._timer_clock() + ms / 1000.0, timer_id, func, args))
+        return timer_id
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, timer_id):
+        self._cancelled.add(timer_id)
+
+    def bind(self, sequence, func):
+        self._bindings[sequence] = func
+
+    def event_generate(self, sequence, when=None):
+        # Virtual events are delivered from the loop, like Tk's when="tail"
+        func = self._bindings.get(sequence)
+        if func:
+            self.after_idle(func, None)
+
+    def run_until(self, end):
+        end = self._timer_clock() + (end - self.clock.time())
+        while self._timers and not self.destroyed:
+            due, timer_id, func, args = self._timers[0]
+            if due > end:
+                break
+            heapq.heappop(self._timers)
+            if timer_id in self._cancelled:
+                self._cancelled.discard(timer_id)
+                continue
+            if due > self._timer_clock():
+                self.wakeups += 1
+                self.clock.advance(due - self._timer_clock())
+            self.callbacks += 1
+            func(*args)
+        if end > self._timer_clock():
+            self.clock.advance(end - self._timer_clock())
+
+    def mainloop(self):
+        self.run_until(float("inf"))
+
+    def destroy(self):
+        self.destroyed = True
+
+    def withdraw(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def winfo_children(self):
+        return []
+
+
+class HeadlessPomodoroOverlay:
+    def __init__(self, root):
+        self.root = root
+        self.visible = True
+        self.text = None
+        self.redraws = 0
+
+    def update_timer(self, text, is_work=True):
+        if self.visible and text != self.text:
+            self.text = text
+            self.redraws += 1
+
+    def show(self):
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+
+class HeadlessMessageOverlay:
+    def __init__(self, root, on_hidden=None, on_closed=None):
+        self.root = root
+        self.on_hidden = on_hidden
+        self.on_closed = on_closed
+        self.visible = False
+        self.current = None
+        self._close_id = None
+        self._shown_at = None
+        self.history = []
+
+    def show(self, title, message, icon_path=None, duration_seconds=10):
+        self.current = (title, message, icon_path, duration_seconds)
+        self.history.append((self.root.clock.time(), title))
+        self.visible = True
+        self._shown_at = self.root.clock.monotonic()
+        self._close_id = self.root.after(duration_seconds * 1000, self.hide)
+
+    def hide(self, event=None):
+        if not self.visible:
+            return
+        self.visible = False
+        if self._close_id is not None:
+            self.root.after_cancel(self._close_id)
+            self._close_id = None
+        if self.on_closed:
+            self.on_closed(self.current[0], self.root.clock.monotonic() - self._shown_at, event is not None)
+        if self.on_hidden:
+            self.on_hidden()
+
+
+class HeadlessBreakConfirmation:
+    # `responder` (set by the simulation) decides how the "user" answers:
+    # it is called with this object whenever the prompt is shown.
+    responder = None
+
+    def __init__(self, root, on_start_break, on_remind_later, icon_path=None, on_hidden=None):
+        self.root = root
+        self.on_start_break = on_start_break
+        self.on_remind_later = on_remind_later
+        self.on_hidden = on_hidden
+        self.icon_path = icon_path
+        self.visible = False
+
+    def show(self):
+        self.visible = True
+        if self.responder:
+            self.responder(self)
+
+    def hide(self):
+        if not self.visible:
+            return
+        self.visible = False
+        if self.on_hidden:
+            self.on_hidden()
+
+    def start_break(self):
+        self.hide()
+        self.on_start_break()
+
+    def remind_later(self):
+        self.hide()
+        self.on_remind_later()
+
+
+class HeadlessBreakOverlay:
+    def __init__(self, root, on_cancel, on_hidden=None):
+        self.root = root
+        self.on_cancel = on_cancel
+        self.on_hidden = on_hidden
+        self.visible = False
+        self.text = None
+
+    def show(self):
+        self.visible = True
+
+    def update_timer(self, text):
+        if self.visible:
+            self.text = text
+
+    def cancel(self):
+        self.close()
+        self.on_cancel()
+
+    def close(self):
+        if not self.visible:
+            return
+        self.visible = False
+        if self.on_hidden:
+            self.on_hidden()
+
+
+class HeadlessOverlayManager(OverlayManager):
+    # The real queueing/coalescing logic with display-free windows
+    message_class = HeadlessMessageOverlay
+    break_confirm_class = HeadlessBreakConfirmation
+    break_overlay_class = HeadlessBreakOverlay
+
+    def warm(self, message_icons):
+        # No icons to decode without a display
+        self.message, self.break_confirm, self.break_overlay
+
+
+class HeadlessUI:
+    # Drop-in for utils.TkUI: HealthReminderApp(clock=VirtualClock(), ui=HeadlessUI(...))
+    PomodoroOverlay = HeadlessPomodoroOverlay
+    OverlayManager = HeadlessOverlayManager
+
+    def __init__(self, clock, wall_timers=False):
+        self.clock = clock
+        self.wall_timers = wall_timers
+
+    def create_root(self):
+        return HeadlessRoot(self.clock, self.wall_timers)
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import struct
+import threading
+
+log = logging.getLogger(__name__)
+
+HISTORY_FILE = "history.bin"
+USERS_FILE = "history_users.json"
+COMMIT_INTERVAL_SECONDS = 1.0
+
+# Codes stored in the reminder/action columns; append only, never reorder
+REMINDERS = ("break", "work", "water", "meal", "custom")
+ACTIONS = (
+    "fire",    # reminder shown (value: seconds late)
+    "dismiss", # message closed by the user (value: seconds on screen)
+    "expire",  # message closed itself after its duration
+    "snooze",  # "Remind Later" on the break prompt
+    "start",   # break started
+    "cancel",  # break cancelled early (value: seconds into the break)
+)
+
+# One fixed-size little-endian record per event, so the file is a packed
+# array that analytics.py maps straight into NumPy columns:
+# ts (float64), user (uint32), reminder (uint8), action (uint8), pad, value (float32)
+RECORD = struct.Struct("<dIBBxxf")
+
+
+class EventHistory:
+    # Append-only reminder history. record() just queues the event and wakes
+    # a writer thread, which waits a commit interval so events close together
+    # go out in one append to history.bin; with nothing recorded it sleeps.
+    # User names are mapped to small integer ids kept in history_users.json.
+    def __init__(self, directory, commit_interval=COMMIT_INTERVAL_SECONDS):
+        self.path = os.path.join(directory, HISTORY_FILE)
+        self.users_path = os.path.join(directory, USERS_FILE)
+        self.commit_interval = commit_interval
+        self.users = load_users(self.users_path)
+        self._user_ids = {name: i for i, name in enumerate(self.users)}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.written = 0
+
+    def record(self, user, reminder, action, ts, value=0.0):
+        # Called from the Tk thread: no I/O here
+        with self._lock:
+            self._pending.append((ts, user, REMINDERS.index(reminder), ACTIONS.index(action), value))
+        self._wake.set()
+
+    def start(self):
+        self._repair()
+        self._thread = threading.Thread(target=self._run, name="EventHistory", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._stop.wait(self.commit_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            data = b"".join(RECORD.pack(ts, self._user_id(user), reminder, action, value)
+                            for ts, user, reminder, action, value in batch)
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self.written += len(batch)
+        except OSError as e:
+            log.error("Could not write reminder history: %s", e)
+
+    def _user_id(self, name):
+        user_id = self._user_ids.get(name)
+        if user_id is None:
+            user_id = self._user_ids[name] = len(self.users)
+            self.users.append(name)
+            tmp_path = self.users_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.users, f)
+            os.replace(tmp_path, self.users_path)
+        return user_id
+
+    def _repair(self):
+        # Drop a partial record left by a crash mid-write
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size % RECORD.size:
+            with open(self.path, "r+b") as f:
+                f.truncate(size - size % RECORD.size)
+
+
+def load_users(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import time
+
+from control import ControlClient, control_address, COMMANDS
+
+USAGE = """usage: hrctl.py [--json] COMMAND [ARG] [COMMAND [ARG] ...]
+
+Controls the running Health Reminder. Several commands are sent as one
+batch and run back to back, e.g. `hrctl.py skip_break pause 30 state`.
+
+commands:
+  state            pomodoro state, time left and upcoming reminders
+  snooze           remind about the pending break again in 5 minutes
+  start_break      start a break now
+  skip_break       skip the pending or running break, start a work block
+  pause MINUTES    no reminders for MINUTES; afterwards a fresh work block
+  resume           end a pause early
+  reload           re-read config.json
+"""
+
+
+def parse(args):
+    # ["pause", "30", "state"] -> [{"cmd": "pause", "minutes": 30.0}, {"cmd": "state"}]
+    commands = []
+    while args:
+        name = args.pop(0).replace("-", "_")
+        if name not in COMMANDS:
+            raise ValueError(f"unknown command {name!r}")
+        request = {"cmd": name}
+        for arg in COMMANDS[name]:
+            if not args:
+                raise ValueError(f"{name} needs {arg.upper()}")
+            try:
+                request[arg] = float(args.pop(0))
+            except ValueError:
+                raise ValueError(f"{name}: {arg.upper()} must be a number")
+        commands.append(request)
+    if not commands:
+        raise ValueError("no command given")
+    return commands
+
+
+def _clock(ts):
+    return time.strftime("%H:%M", time.localtime(ts))
+
+
+def describe(request, reply):
+    if not reply.get("ok"):
+        return f"{request['cmd']}: error: {reply.get('error')}"
+    if request["cmd"] == "pause":
+        return f"paused until {_clock(reply['paused_until'])}"
+    if request["cmd"] != "state":
+        return f"{request['cmd']}: ok"
+    if reply["paused_until"] is not None:
+        lines = [f"paused until {_clock(reply['paused_until'])}"]
+    elif not reply["pomodoro_enabled"]:
+        lines = ["pomodoro off"]
+    else:
+        mins, secs = divmod(int(reply["remaining"]), 60)
+        lines = [f"{reply['state'].lower()} {mins:02d}:{secs:02d} left"]
+    for name, entry in sorted(reply["upcoming"].items(), key=lambda item: item[1]["at"]):
+        lines.append(f"  {name:<12} {_clock(entry['at'])}")
+    return "\n".join(lines)
+
+
+def main(argv):
+    as_json = "--json" in argv
+    args = [arg for arg in argv if arg != "--json"]
+    if not args or args[0] in ("-h", "--help"):
+        print(USAGE)
+        return 0 if args else 2
+    try:
+        commands = parse(args)
+    except ValueError as e:
+        print(f"hrctl: {e}", file=sys.stderr)
+        return 2
+    address = control_address(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        with ControlClient(address) as client:
+            replies = client.request(commands)
+    except (OSError, EOFError) as e:
+        print(f"hrctl: Health Reminder is not running ({e})", file=sys.stderr)
+        return 3
+    if as_json:
+        print(json.dumps(replies, indent=2))
+    elif len(replies) == len(commands):
+        for request, reply in zip(commands, replies):
+            print(describe(request, reply))
+    else:
+        # The batch as a whole failed (bad request, app not responding)
+        for reply in replies:
+            print(f"hrctl: {reply.get('error')}", file=sys.stderr)
+    return 0 if all(reply.get("ok") for reply in replies) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,149 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+LOG_FILE = "health_reminder.log"
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+MAX_PENDING = 1000
+# Identical errors (same logger, level, message and exception type) are
+# written once per window; the next one that gets through carries the count
+DEDUP_WINDOW_SECONDS = 60
+DEDUP_MAX_KEYS = 256
+
+_listener = None
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    # One UTF-8 JSON object per line
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DedupFilter(logging.Filter):
+    # Runs in the logging thread before a record is queued, so a persistent
+    # error costs one dict lookup per repeat instead of a queued traceback
+    def __init__(self, window=DEDUP_WINDOW_SECONDS, max_keys=DEDUP_MAX_KEYS):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._seen = OrderedDict() # key -> [first_written_at, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        # The formatted message, so only identical errors collapse; the same
+        # template with different arguments is a different error
+        try:
+            message = record.getMessage()
+        except Exception:
+            message = str(record.msg) # bad arguments; the formatter reports it
+        key = (record.name, record.levelno, message, exc_type)
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and record.created - seen[0] < self.window:
+                seen[1] += 1
+                return False
+            record.suppressed = seen[1] if seen is not None else 0
+            self._seen[key] = [record.created, 0]
+            self._seen.move_to_end(key)
+            if len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    # Never blocks the caller: when the writer falls behind, records are
+    # dropped and counted, and the count is logged once it catches up
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+
+    def prepare(self, record):
+        # Merge args and render the traceback now (the frames may be gone by
+        # the time the writer runs) but keep it in its own field
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped != self._reported:
+            lost = self.dropped - self._reported
+            self._reported = self.dropped
+            notice = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                       "Log queue full, dropped %d records", (lost,), None)
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                pass
+
+
+def setup_logging(directory, level=logging.INFO, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+    # Routes every logger through a bounded queue to a background thread that
+    # owns all file I/O (a size-rotated JSON-lines file, plus stderr when
+    # there is one, i.e. not under pythonw.exe)
+    global _listener
+    if _listener is not None:
+        return _listener
+    file_handler = logging.handlers.RotatingFileHandler(os.path.join(directory, LOG_FILE), maxBytes=max_bytes,
+                                                        backupCount=backup_count, encoding="utf-8", delay=True)
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if sys.stderr is not None:
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S"))
+        handlers.append(console)
+
+    log_queue = queue.Queue(maxsize=MAX_PENDING)
+    queue_handler = BoundedQueueHandler(log_queue)
+    queue_handler.addFilter(DedupFilter())
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    # Flushes whatever is still queued; safe to call more than once
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,82 +1,193 @@
-import time
+import logging
+import math
 import threading
-from datetime import datetime
-import pystray
-from PIL import Image, ImageDraw
+import time
 import os
 import sys
-from utils import load_config, save_config, notify, set_autostart, is_autostart_enabled, show_fullscreen_message, PomodoroOverlay, BreakConfirmationUI, BreakFullscreenOverlay
+from utils import load_config, save_config, notify, count_widgets, TkUI
+from clock import SystemClock, TimeJumpDetector
+from dispatch import dispatcher
+from commands import CommandChannel
+from backends import get_backend, AutostartService, TrayItem
+from settings import ConfigSnapshot
+from watcher import ConfigWatcher
+from metrics import (registry, Gauge, MetricsServer, TICK_SECONDS, FIRING_LATENESS_SECONDS,
+                     CONFIG_RELOADS, CONFIG_RELOAD_SECONDS, TK_WINDOWS, RSS_BYTES, CONTROL_COMMANDS, TIME_JUMPS)
+from profiler import SamplingProfiler
+from logs import setup_logging
+from persist import StateStore
+from history import EventHistory
+from trayicon import TrayIconRenderer, icon_key
+from control import ControlServer, control_address, COMMANDS, REPLY_TIMEOUT_SECONDS
+from engine import (ReminderEngine, WORK, BREAK_PENDING, BREAK, REMIND_LATER, BREAK_DUE, WORK_DUE, WATER, MEAL,
+                    CUSTOM, MAX_PAUSE_SECONDS)
 
 # Ensure we are in the script's directory (important for autostart)
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+log = logging.getLogger("health_reminder")
+
+# Longest the loop sleeps with nothing due
+MAX_IDLE_SECONDS = 60
+
+# The desktop app drives a single schedule in the engine
+SESSION_KEY = "default"
+
+# Pomodoro state -> what the tray icon shows (see trayicon.STATE_COLORS)
+TRAY_STATES = {WORK: "work", REMIND_LATER: "snooze", BREAK: "break", BREAK_PENDING: "pending"}
+TRAY_LABELS = {"work": "Work", "snooze": "Snoozed", "break": "Break", "pending": "Break due", "idle": "Running",
+               "paused": "Paused"}
+
+# Reminder names used in the event history (see history.REMINDERS)
+EVENT_REMINDERS = {BREAK_DUE: "break", WORK_DUE: "work", WATER: "water", MEAL: "meal", CUSTOM: "custom"}
+MESSAGE_REMINDERS = {"Work Time": "work", "Water Reminder": "water", "Meal Time": "meal",
+                     "Welcome Back": None} # the catch-up summary isn't a reminder
+
+# Counting widgets walks the whole Tk tree, so only do it this often
+WIDGET_SAMPLE_SECONDS = 10
+
+# Tcl 8.6 runs `after` timers off the wall clock: setting the clock back
+# holds the pending tick back by the size of the step (setting it forward
+# just fires it early). A watchdog thread, which waits on its own steady
+# timeout until the tick is due, wakes the loop through the command
+# channel when the tick is this many seconds late.
+WATCHDOG_SECONDS = 5
+
 class HealthReminderApp:
-    def __init__(self):
-        self.config = load_config()
+    def __init__(self, clock=None, ui=None, config=None, state_store=None, history=None):
+        # clock/ui/config are injectable so the loop can run against a
+        # VirtualClock and headless widgets (see headless.py, benchmark.py sim).
+        # Without a state_store nothing is persisted across restarts, without
+        # a history (history.EventHistory) nothing is recorded.
+        self.clock = clock or SystemClock()
+        self.ui = ui or TkUI()
+        self.config = config or load_config()
         self.running = True
         self.icon = None
-        self.pomodoro_start_time = time.time()
-        self.water_start_time = time.time()
-        self.last_meal_check = ""
         self.config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        self.last_config_mtime = os.path.getmtime(self.config_path) if os.path.exists(self.config_path) else 0
+        self.config_watcher = ConfigWatcher(self.config_path, self.on_config_changed)
         self.assets_dir = os.path.dirname(__file__)
-        import tkinter as tk
-        self.root = tk.Tk()
-        self.root.withdraw() # Main root is hidden
-        self.pomodoro_overlay = PomodoroOverlay(self.root) if self.config["pomodoro"]["enabled"] else None
-        
-        # New Pomodoro State Management
-        self.pomodoro_state = "WORK"
-        self.pomodoro_duration = self.config["pomodoro"]["work_minutes"] * 60
-        self.pomodoro_start_time = time.time()
-        self.break_ui = None
-        self.break_overlay = None
-        
-        # Track when reminders were last shown to avoid duplicates if loop runs fast
-        self.last_reminders = {
-            "pomodoro_work": 0,
-            "pomodoro_break": 0,
-            "water": 0
-        }
-        
-        # Check if autostart matches config
-        current_autostart = is_autostart_enabled()
-        if self.config.get("auto_start", False) != current_autostart:
-            set_autostart(self.config.get("auto_start", False))
-
-    def create_image(self):
-        # Generate a simple icon: a green circle
-        width = 64
-        height = 64
-        image = Image.new('RGB', (width, height), (255, 255, 255))
-        dc = ImageDraw.Draw(image)
-        dc.ellipse([10, 10, 54, 54], fill=(0, 200, 0))
-        return image
+        self.root = self.ui.create_root()
+        # Other threads never touch Tk or app state directly; they post here
+        self.commands = CommandChannel(self.root)
+        self.pomodoro_overlay = self.ui.PomodoroOverlay(self.root) if self.overlay_wanted() else None
+        # The tray icon shows state + minutes left; it is only re-rendered and
+        # pushed when what it shows changes (about once a minute)
+        self.tray_renderer = TrayIconRenderer()
+        self._tray_key = None
+        self.tray_pushes = 0
+
+        # Reminder timing and the pomodoro state machine live in the UI-free engine;
+        # this app drives a single schedule and renders its events.
+        self.engine = ReminderEngine()
+        self.state_store = state_store
+        self.history = history
+        # Held while the tray's Reminder Stats report is being built
+        self._stats_lock = threading.Lock()
+        saved = state_store.load().get(SESSION_KEY) if state_store is not None else None
+        if saved is not None:
+            self.session = self.engine.restore_schedule(SESSION_KEY, self.config, saved, self.clock.time())
+        else:
+            self.session = self.engine.add_schedule(SESSION_KEY, self.config, self.clock.time())
+        # Spots suspend/resume and wall-clock steps between ticks (see tick)
+        self.time_jumps = TimeJumpDetector(self.clock)
+        self._watchdog_stop = threading.Event()
+        # Fullscreen overlays are built once here and reused for every reminder
+        self.overlays = self.ui.OverlayManager(self.root,
+                                       on_start_break=self.start_break,
+                                       on_remind_later=self.remind_later,
+                                       on_cancel_break=self.cancel_break,
+                                       break_icon_path=os.path.join(self.assets_dir, "break_icon.png"),
+                                       on_message_closed=self.on_message_closed)
+        # Decode and scale the reminder icons once the loop is idle
+        self.root.after_idle(self.overlays.warm, [os.path.join(self.assets_dir, name)
+                                                  for name in ("water_icon.png", "meal_icon.png", "work_icon.png")])
+        self._tick_id = None
+        self._widgets_sampled_at = None
+        # Reminders that came due while the app was down go through the same
+        # catch-up policy as a resume from suspend
+        if saved is not None and state_store.last_seen is not None:
+            self.catch_up(self.clock.time(), self.clock.time() - state_store.last_seen)
+        # A restored session may be mid-break or waiting on the break prompt
+        if self.session.pomodoro_state == BREAK_PENDING:
+            self.root.after_idle(self.overlays.show_break_confirmation)
+        elif self.session.pomodoro_state == BREAK:
+            self.root.after_idle(self.overlays.show_break)
+        # Diagnostics: /metrics is served from start_background, the sampling
+        # profiler only runs while toggled on from the tray
+        self.metrics_server = None
+        self.profiler = SamplingProfiler()
+        # Local control API (control.py, hrctl.py), also started from start_background
+        self.control_server = None
+
+        # Autostart state is cached; it is synced with the config off the
+        # startup path (see start_background)
+        self.autostart = AutostartService(get_backend())
 
+    # --- Tray callbacks: these run on the pystray thread and only post commands ---
     def on_quit(self, icon, item):
-        self.running = False
         icon.stop()
-        try:
-            self.root.after(0, self.root.destroy)
-        except:
-            pass
-
-    def toggle_autostart(self, icon, item):
-        new_state = not is_autostart_enabled()
-        if set_autostart(new_state):
-            self.config["auto_start"] = new_state
+        self.commands.post(self.quit)
+
+    def on_toggle_autostart(self, icon, item):
+        self.commands.post(self.toggle_autostart)
+
+    def on_diagnostics(self, icon, item):
+        self.commands.post(self.show_diagnostics)
+
+    def on_toggle_profiler(self, icon, item):
+        self.commands.post(self.toggle_profiler)
+
+    def on_stats(self, icon, item):
+        # Analytics only reads history files, so it runs on its own thread
+        # rather than holding up a notification worker. A click while the
+        # last report is still being built is ignored.
+        if not self._stats_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self.report_stats, name="Stats", daemon=True).start()
+
+    def quit(self):
+        self.running = False
+        self._watchdog_stop.set()
+        self.config_watcher.stop()
+        self.autostart.stop()
+        if self.profiler.running:
+            self.profiler.stop(self.assets_dir)
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.control_server is not None:
+            self.control_server.stop()
+        if self.state_store is not None:
+            self.persist(self.clock.time())
+            self.state_store.close()
+        if self.history is not None:
+            self.history.close()
+        dispatcher.stop()
+        self.root.destroy()
+
+    def toggle_autostart(self):
+        # Clicked before the startup sync finished: ask the OS once
+        new_state = not self.autostart.current()
+        if self.autostart.set(new_state):
+            data = self.config.to_dict()
+            data["auto_start"] = new_state
+            self.config = ConfigSnapshot(data)
             save_config(self.config)
             notify("Auto-start", f"Auto-start {'enabled' if new_state else 'disabled'}")
 
-    def run_tray(self):
-        menu = pystray.Menu(
-            pystray.MenuItem("Health Reminder Running", lambda: None, enabled=False),
-            pystray.MenuItem("Settings", self.open_settings),
-            pystray.MenuItem("Auto-start", self.toggle_autostart, checked=lambda item: is_autostart_enabled()),
-            pystray.MenuItem("Quit", self.on_quit)
-        )
-        self.icon = pystray.Icon("HealthReminder", self.create_image(), "Health Reminder", menu)
+    def run_tray(self, image):
+        items = [
+            TrayItem("Health Reminder Running", None, enabled=False),
+            TrayItem("Settings", self.open_settings),
+            TrayItem("Auto-start", self.on_toggle_autostart, checked=lambda item: self.autostart.enabled()),
+            TrayItem("Reminder Stats", self.on_stats),
+            TrayItem("Diagnostics", self.on_diagnostics),
+            TrayItem("Profile Reminder Loop", self.on_toggle_profiler, checked=lambda item: self.profiler.running),
+            TrayItem("Quit", self.on_quit),
+        ]
+        self.icon = get_backend().create_tray("HealthReminder", self.tray_title(), image, items)
+        # The countdown may have moved on while the icon was being created
+        self.commands.post(self.push_tray_icon)
         self.icon.run()
 
     def open_settings(self, icon, item):
@@ -84,133 +195,453 @@ class HealthReminderApp:
         config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'config.json'))
         notify("Settings", f"Edit settings in: {config_path}")
 
+    def show_diagnostics(self):
+        # Write the full metrics dump next to the app and toast the headline numbers
+        TK_WINDOWS.set(count_widgets(self.root))
+        path = os.path.join(self.assets_dir, "diagnostics.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(registry.render_prometheus())
+        summary = (f"Tick p99 <= {TICK_SECONDS.quantile(0.99) * 1000:g} ms, "
+                   f"RSS {RSS_BYTES.value() / 1e6:.0f} MB, {TK_WINDOWS.value()} widgets. ")
+        if self.metrics_server is not None:
+            summary += f"Live: http://127.0.0.1:{self.metrics_server.port}/metrics"
+        else:
+            summary += f"Full dump: {path}"
+        notify("Diagnostics", summary)
+
+    def report_stats(self):
+        # Runs on the Stats thread with _stats_lock held (see on_stats)
+        try:
+            from analytics import Aggregates # NumPy is only loaded when stats are asked for
+            aggregates = Aggregates(self.assets_dir)
+            aggregates.update()
+            from datetime import date
+            week_ago = (self.clock.now().date() - date(1970, 1, 1)).days - 7
+            stats = aggregates.adherence(SESSION_KEY, since_day=week_ago)
+            notify("Last 7 days",
+                   f"Breaks taken: {stats['breaks_started']}/{stats['break_prompts']}, "
+                   f"snoozed: {stats['breaks_snoozed']}. Water dismissed right away: "
+                   f"{stats['water_quick_dismissals']}/{stats['water_reminders']}")
+        except Exception:
+            log.exception("Could not build reminder stats")
+        finally:
+            self._stats_lock.release()
+
+    def toggle_profiler(self):
+        if self.profiler.running:
+            path = self.profiler.stop(self.assets_dir)
+            notify("Profiler", f"Profile written to {path}")
+        else:
+            self.profiler.start()
+            notify("Profiler", "Sampling the reminder loop; toggle again to save the profile")
+
     def reminder_loop(self):
-        while self.running:
-            try:
-                now = time.time()
-                # --- Efficient Config Reload (only if file changed) ---
-                if os.path.exists(self.config_path):
-                    current_mtime = os.path.getmtime(self.config_path)
-                    if current_mtime > self.last_config_mtime:
-                        print(f"Config change detected! Reloading... ({datetime.now().strftime('%H:%M:%S')})")
-                        self.config = load_config()
-                        self.last_config_mtime = current_mtime
-
-                current_time_str = datetime.now().strftime("%H:%M")
-                # print(f"Checking reminders... Time: {current_time_str}") # Debugging
-
-                
-                # --- Pomodoro Check (State Machine) ---
-                if self.config["pomodoro"]["enabled"]:
-                    elapsed = now - self.pomodoro_start_time
-                    remaining = max(0, self.pomodoro_duration - elapsed)
-                    mins, secs = divmod(int(remaining), 60)
-                    timer_text = f"{mins:02d}:{secs:02d}"
-
-                    if self.pomodoro_state == "WORK":
-                        if self.pomodoro_overlay:
-                            self.pomodoro_overlay.update_timer(timer_text, is_work=True)
-                            self.pomodoro_overlay.show()
-                        
-                        if elapsed >= self.pomodoro_duration:
-                            self.pomodoro_state = "BREAK_PENDING"
-                            if self.pomodoro_overlay: self.pomodoro_overlay.hide()
-                            self.break_ui = BreakConfirmationUI(
-                                self.root, 
-                                on_start_break=self.start_break, 
-                                on_remind_later=self.remind_later,
-                                icon_path=os.path.join(self.assets_dir, "break_icon.png")
-                            )
-
-                    elif self.pomodoro_state == "BREAK":
-                        if self.break_overlay:
-                            self.break_overlay.update_timer(timer_text)
-                        
-                        if elapsed >= self.pomodoro_duration:
-                            self.pomodoro_state = "WORK"
-                            self.pomodoro_duration = self.config["pomodoro"]["work_minutes"] * 60
-                            self.pomodoro_start_time = now
-                            if self.break_overlay:
-                                self.break_overlay.close()
-                                self.break_overlay = None
-                            
-                            show_fullscreen_message(self.root, "Work Time", f"Time to work for {self.config['pomodoro']['work_minutes']} mins!", 
-                                                     icon_path=os.path.join(self.assets_dir, "work_icon.png"))
-
-                    elif self.pomodoro_state == "REMIND_LATER":
-                        if self.pomodoro_overlay:
-                            self.pomodoro_overlay.update_timer(timer_text, is_work=False)
-                            self.pomodoro_overlay.show()
-                        
-                        if elapsed >= self.pomodoro_duration:
-                            self.pomodoro_state = "BREAK_PENDING"
-                            if self.pomodoro_overlay: self.pomodoro_overlay.hide()
-                            self.break_ui = BreakConfirmationUI(
-                                self.root,
-                                on_start_break=self.start_break,
-                                on_remind_later=self.remind_later,
-                                icon_path=os.path.join(self.assets_dir, "break_icon.png")
-                            )
-
-                    elif self.pomodoro_state == "BREAK_PENDING":
-                        # Just waiting for UI interaction
-                        pass
-                else:
-                    if self.pomodoro_overlay:
-                        self.pomodoro_overlay.hide()
-
-                # --- Water Check ---
-                if self.config["water"]["enabled"]:
-                    water_sec = self.config["water"]["interval_minutes"] * 60
-                    if now - self.water_start_time >= water_sec:
-                        show_fullscreen_message(self.root, "Water Reminder", "Time to drink some water!",
-                                                icon_path=os.path.join(self.assets_dir, "water_icon.png"))
-                        self.water_start_time = time.time() # Reset based on current time
-                        self.last_reminders["water"] = now
-
-                # --- Meal Check ---
-                if self.config["meals"]["enabled"]:
-                    if current_time_str in self.config["meals"]["timings"] and current_time_str != self.last_meal_check:
-                        print(f"Triggering meal reminder for {current_time_str}")
-                        show_fullscreen_message(self.root, "Meal Time", f"It's {current_time_str}! Time for your scheduled meal.",
-                                                icon_path=os.path.join(self.assets_dir, "meal_icon.png"))
-                        self.last_meal_check = current_time_str
-            except Exception as e:
-                print(f"CRITICAL ERROR in reminder loop: {e}")
-                import traceback
-                traceback.print_exc()
-            
+        # Event driven: instead of waking every 100 ms, each tick handles whatever
+        # deadlines are due, redraws the countdown and re-arms a single Tk `after`
+        # for the earliest next event.
+        self.tick()
+        self.root.mainloop()
+
+    def tick(self):
+        self._tick_id = None
+        if not self.running:
+            return
+        started = time.perf_counter()
+        try:
+            now = self.clock.time()
+            jump = self.time_jumps.check()
+            if jump is not None:
+                self.on_time_jump(jump, now)
+            for event in self.engine.poll(now):
+                FIRING_LATENESS_SECONDS.observe(event.fired_at - event.deadline, event.kind)
+                self.handle_event(event)
+            self.render(now)
+            self.persist(now)
+            if self._widgets_sampled_at is None or started - self._widgets_sampled_at >= WIDGET_SAMPLE_SECONDS:
+                self._widgets_sampled_at = started
+                TK_WINDOWS.set(count_widgets(self.root))
+        except Exception:
+            # Repeats of the same failure are collapsed by the log's dedup filter
+            log.exception("Error in reminder loop")
+        self.schedule_tick()
+        TICK_SECONDS.observe(time.perf_counter() - started)
+
+    def persist(self, now):
+        # Hands changed schedule state to the store's writer thread (no I/O here)
+        dirty = self.engine.take_dirty()
+        if self.state_store is None:
+            return
+        for key in dirty:
+            schedule = self.engine.schedules.get(key)
+            if schedule is not None:
+                self.state_store.record(key, schedule.state(), now)
+
+    def schedule_tick(self):
+        now = self.clock.time()
+        delay = MAX_IDLE_SECONDS
+        next_deadline = self.engine.next_deadline()
+        if next_deadline is not None:
+            delay = min(delay, next_deadline - now)
+        if self.countdown_visible():
+            # Wake exactly when the displayed MM:SS changes
+            remaining = self.session.remaining(now)
+            if remaining > 0:
+                delay = min(delay, (remaining - math.floor(remaining)) or 1.0)
+        else:
+            # Only the tray shows the countdown: wake when its minute changes
+            remaining = self.tray_countdown(now)[1]
+            if remaining > 0:
+                delay = min(delay, (remaining % 60) or 60.0)
+        self.time_jumps.expect(delay)
+        delay_ms = max(1, math.ceil(delay * 1000))
+        try:
+            self._tick_id = self.root.after(delay_ms, self.tick)
+        except Exception:
+            pass # Root already destroyed
+
+    def on_time_jump(self, jump, now):
+        # Deadlines are wall-clock times. After a step, the timers that
+        # measure elapsed time are moved along with the clock; whatever came
+        # due while suspended (or was skipped by a forward step) goes through
+        # the catch-up policy instead of firing as a burst.
+        if jump.step:
+            log.warning("Wall clock stepped by %+.0f s", jump.step)
+            TIME_JUMPS.inc(1, "step")
+            self.engine.clock_stepped(SESSION_KEY, jump.step)
+        if jump.suspended:
+            log.info("Resumed after about %.0f s", jump.suspended)
+            TIME_JUMPS.inc(1, "resume")
+        away = jump.suspended + max(0.0, jump.step)
+        if away:
+            self.catch_up(now, away)
+
+    def catch_up(self, now, away):
+        missed = self.engine.catch_up(SESSION_KEY, now, away)
+        if not missed:
+            return
+        log.info("Catching up (%s) on %s", self.config.catch_up, ", ".join(missed))
+        if self.session.pomodoro_state == WORK:
+            # A break or break prompt that ran out while away
+            self.overlays.hide_break_confirmation()
+            self.overlays.close_break()
+        if self.config.catch_up == "fire_once":
+            titles = [self.config.rule_map[name].title if name in self.config.rule_map else "Break"
+                      for name in missed]
+            self.overlays.show_message("Welcome Back", f"While you were away: {', '.join(titles)}.")
+
+    def wake(self):
+        # Something changed outside a tick (UI callback): re-evaluate right away
+        if self._tick_id is not None:
+            self.root.after_cancel(self._tick_id)
+        self._tick_id = self.root.after_idle(self.tick)
+
+    def tick_overdue(self):
+        return self.running and self.time_jumps.overdue(WATCHDOG_SECONDS)
+
+    def start_watchdog(self):
+        # Sleeps until the expected tick is WATCHDOG_SECONDS late, so it wakes
+        # about once per tick. after_idle and the command event don't go
+        # through Tcl's timers, so the woken tick runs even while its `after`
+        # is held back by a step.
+        def loop():
+            while True:
+                wait = self.time_jumps.until_overdue(WATCHDOG_SECONDS)
+                if wait == 0.0:
+                    self.commands.post(self.wake)
+                    wait = WATCHDOG_SECONDS # give the woken tick time to run
+                if self._watchdog_stop.wait(WATCHDOG_SECONDS if wait is None else wait):
+                    return
+        threading.Thread(target=loop, name="TickWatchdog", daemon=True).start()
+
+    def on_config_changed(self):
+        # Called from the watcher thread; hand the reload over to the Tk thread
+        self.commands.post(self.reload_config)
+
+    def reload_config(self, config=None):
+        # Returns False if the new config was rejected
+        log.info("Config change detected, reloading")
+        started = time.perf_counter()
+        if config is None:
             try:
-                self.root.update()
-            except:
-                pass
-            time.sleep(0.1)
+                config = load_config()
+            except (ValueError, OSError) as e:
+                # Covers ConfigError and half-written JSON; keep the last good config
+                log.warning("Ignoring invalid config: %s", e)
+                CONFIG_RELOADS.inc(1, "invalid")
+                return False
+        self.config = config
+        changed = self.engine.update_config(SESSION_KEY, config, self.clock.time())
+        if "pomodoro" in changed:
+            if self.overlay_wanted() and self.pomodoro_overlay is None:
+                self.pomodoro_overlay = self.ui.PomodoroOverlay(self.root)
+            elif not self.overlay_wanted() and self.pomodoro_overlay is not None:
+                self.pomodoro_overlay.hide()
+                self.pomodoro_overlay = None
+        CONFIG_RELOADS.inc(1, "ok")
+        CONFIG_RELOAD_SECONDS.observe(time.perf_counter() - started)
+        self.wake()
+        return True
+
+    def record(self, reminder, action, value=0.0):
+        if self.history is not None:
+            self.history.record(SESSION_KEY, reminder, action, self.clock.time(), value)
+
+    def on_message_closed(self, title, shown_seconds, by_user):
+        # Any other title comes from a custom rule
+        reminder = MESSAGE_REMINDERS.get(title, "custom")
+        if reminder is not None:
+            self.record(reminder, "dismiss" if by_user else "expire", shown_seconds)
+
+    def handle_event(self, event):
+        self.record(EVENT_REMINDERS[event.kind], "fire", event.fired_at - event.deadline)
+        if event.kind == BREAK_DUE:
+            if self.pomodoro_overlay: self.pomodoro_overlay.hide()
+            self.overlays.show_break_confirmation()
+        elif event.kind == WORK_DUE:
+            self.overlays.close_break()
+            self.overlays.show_message("Work Time", f"Time to work for {self.config.work_minutes} mins!",
+                                       icon_path=os.path.join(self.assets_dir, "work_icon.png"))
+        elif event.kind == WATER:
+            self.overlays.show_message("Water Reminder", "Time to drink some water!",
+                                       icon_path=os.path.join(self.assets_dir, "water_icon.png"))
+        elif event.kind == MEAL:
+            log.info("Triggering meal reminder for %s", event.detail)
+            self.overlays.show_message("Meal Time", f"It's {event.detail}! Time for your scheduled meal.",
+                                       icon_path=os.path.join(self.assets_dir, "meal_icon.png"))
+        elif event.kind == CUSTOM:
+            rule = self.config.rule_map.get(event.rule)
+            if rule is not None:
+                self.overlays.show_message(rule.title, rule.message)
+
+    def overlay_wanted(self):
+        return self.config.pomodoro_enabled and self.config.pomodoro_overlay
+
+    def tray_countdown(self, now):
+        # (tray state, seconds left); 0 when nothing is counting down
+        if self.session.paused_until is not None:
+            return "paused", max(0, self.session.paused_until - now)
+        if not self.config.pomodoro_enabled:
+            return "idle", 0
+        state = TRAY_STATES[self.session.pomodoro_state]
+        return state, 0 if state == "pending" else self.session.remaining(now)
+
+    def update_tray(self, now):
+        key = icon_key(*self.tray_countdown(now))
+        # Same key, same pixels: nothing to push
+        if key != self._tray_key:
+            self._tray_key = key
+            if self.icon is not None:
+                self.push_tray_icon()
+
+    def push_tray_icon(self):
+        if self.icon is None or self._tray_key is None:
+            return
+        self.icon.icon = self.tray_renderer.render(self._tray_key)
+        self.icon.title = self.tray_title()
+        self.tray_pushes += 1
+
+    def tray_title(self):
+        state, text = self._tray_key or ("idle", "")
+        return f"Health Reminder - {TRAY_LABELS[state]}" + (f": {text} min left" if text else "")
+
+    def render(self, now):
+        self.update_tray(now)
+        if not self.config.pomodoro_enabled or self.session.paused_until is not None:
+            if self.pomodoro_overlay:
+                self.pomodoro_overlay.hide()
+            return
+
+        mins, secs = divmod(int(self.session.remaining(now)), 60)
+        timer_text = f"{mins:02d}:{secs:02d}"
+
+        state = self.session.pomodoro_state
+        if state in (WORK, REMIND_LATER):
+            if self.pomodoro_overlay:
+                self.pomodoro_overlay.show()
+                self.pomodoro_overlay.update_timer(timer_text, is_work=state == WORK)
+        elif state == BREAK:
+            self.overlays.break_overlay.update_timer(timer_text)
+
+    def countdown_visible(self):
+        if not self.config.pomodoro_enabled or self.session.paused_until is not None:
+            return False
+        state = self.session.pomodoro_state
+        if state in (WORK, REMIND_LATER):
+            return self.pomodoro_overlay is not None
+        return state == BREAK and self.overlays.break_overlay.visible
 
     def start_break(self):
-        self.pomodoro_state = "BREAK"
-        self.pomodoro_duration = self.config["pomodoro"]["break_minutes"] * 60
-        self.pomodoro_start_time = time.time()
-        self.break_overlay = BreakFullscreenOverlay(self.root, on_cancel=self.cancel_break)
+        self.record("break", "start")
+        self.engine.start_break(SESSION_KEY, self.clock.time())
+        self.overlays.show_break()
+        self.wake()
 
     def cancel_break(self):
-        self.pomodoro_state = "WORK"
-        self.pomodoro_duration = self.config["pomodoro"]["work_minutes"] * 60
-        self.pomodoro_start_time = time.time()
-        if self.break_overlay:
-            self.break_overlay.close()
-            self.break_overlay = None
+        now = self.clock.time()
+        self.record("break", "cancel", now - self.session.pomodoro_start)
+        self.engine.cancel_break(SESSION_KEY, now)
+        self.overlays.close_break()
+        self.wake()
 
     def remind_later(self):
-        self.pomodoro_state = "REMIND_LATER"
-        self.pomodoro_duration = 5 * 60
-        self.pomodoro_start_time = time.time()
+        self.record("break", "snooze")
+        self.engine.remind_later(SESSION_KEY, self.clock.time())
+        self.wake()
+
+    # --- Control API (control.py). Batches arrive on a connection thread and
+    # run as a single command on the Tk thread ---
+    def on_control_batch(self, requests):
+        replies = []
+        done = threading.Event()
+        self.commands.post(self.run_control_batch, requests, replies, done)
+        if not done.wait(REPLY_TIMEOUT_SECONDS):
+            return [{"ok": False, "error": "reminder loop did not respond"}]
+        return replies
+
+    def run_control_batch(self, requests, replies, done):
+        try:
+            for request in requests:
+                name = request.get("cmd") if isinstance(request, dict) else None
+                if name not in COMMANDS:
+                    CONTROL_COMMANDS.inc(1, "unknown", "error")
+                    replies.append({"ok": False, "error": f"unknown command {name!r}"})
+                    continue
+                try:
+                    reply = getattr(self, "control_" + name)(request, self.clock.time())
+                except ValueError as e:
+                    CONTROL_COMMANDS.inc(1, name, "error")
+                    replies.append({"ok": False, "error": str(e)})
+                    continue
+                CONTROL_COMMANDS.inc(1, name, "ok")
+                reply["ok"] = True
+                replies.append(reply)
+        finally:
+            done.set()
+
+    def control_state(self, request, now):
+        session = self.session
+        upcoming = {name: {"at": deadline, "label": label} for name, (deadline, label) in session.upcoming.items()}
+        if self.engine.scheduler.deadline((SESSION_KEY, "pomodoro")) is not None:
+            upcoming["pomodoro"] = {"at": session.pomodoro_start + session.pomodoro_duration, "label": None}
+        return {
+            "time": now,
+            "pomodoro_enabled": self.config.pomodoro_enabled,
+            "state": session.pomodoro_state,
+            "remaining": session.remaining(now),
+            "paused_until": session.paused_until,
+            "upcoming": upcoming,
+        }
+
+    def _require(self, *states):
+        if self.session.paused_until is not None:
+            raise ValueError("reminders are paused")
+        if not self.config.pomodoro_enabled:
+            raise ValueError("pomodoro is disabled")
+        if self.session.pomodoro_state not in states:
+            raise ValueError(f"not possible in state {self.session.pomodoro_state}")
+
+    def control_snooze(self, request, now):
+        self._require(BREAK_PENDING)
+        self.overlays.hide_break_confirmation()
+        self.remind_later()
+        return {}
+
+    def control_start_break(self, request, now):
+        self._require(WORK, REMIND_LATER, BREAK_PENDING)
+        self.overlays.hide_break_confirmation()
+        if self.pomodoro_overlay: self.pomodoro_overlay.hide()
+        self.start_break()
+        return {}
+
+    def control_skip_break(self, request, now):
+        # Straight back to a fresh work block, from the prompt or mid-break
+        self._require(BREAK_PENDING, BREAK)
+        if self.session.pomodoro_state == BREAK:
+            self.cancel_break()
+            return {}
+        self.overlays.hide_break_confirmation()
+        self.record("break", "dismiss")
+        self.engine.cancel_break(SESSION_KEY, now)
+        self.wake()
+        return {}
+
+    def control_pause(self, request, now):
+        minutes = request.get("minutes")
+        if isinstance(minutes, bool) or not isinstance(minutes, (int, float)) \
+                or not 0 < minutes * 60 <= MAX_PAUSE_SECONDS:
+            raise ValueError(f"minutes must be a number between 0 and {MAX_PAUSE_SECONDS // 60}")
+        self.engine.pause(SESSION_KEY, now + minutes * 60)
+        self.overlays.hide_break_confirmation()
+        self.overlays.close_break()
+        self.wake()
+        return {"paused_until": self.session.paused_until}
+
+    def control_resume(self, request, now):
+        if self.session.paused_until is None:
+            raise ValueError("reminders are not paused")
+        self.engine.resume(SESSION_KEY, now)
+        self.wake()
+        return {}
+
+    def control_reload(self, request, now):
+        if not self.reload_config():
+            raise ValueError("config.json is invalid; kept the previous settings")
+        return {}
 
     def start(self):
-        # Start the tray icon in a background thread
-        threading.Thread(target=self.run_tray, daemon=True).start()
+        # The first tick runs before anything that isn't needed for it: the tray
+        # (pystray + PIL) and the config watcher start once the loop is idle
+        self.root.after_idle(self.start_background)
         # Run the reminder loop in the main thread (needed for Tkinter)
         self.reminder_loop()
 
+    def start_background(self):
+        self.config_watcher.start()
+        if self.state_store is not None:
+            self.state_store.start()
+        if self.history is not None:
+            self.history.start()
+        dispatcher.preload_sound()
+        self.start_watchdog()
+        # Check if autostart matches config, then only re-check occasionally
+        threading.Thread(target=self.autostart.sync, args=(self.config.auto_start,), daemon=True).start()
+        self.autostart.start_refresh()
+        self.start_metrics()
+        self.start_control()
+        # Start the tray icon in a background thread
+        image = self.tray_renderer.render(self._tray_key or ("idle", ""))
+        threading.Thread(target=self.run_tray, args=(image,), daemon=True).start()
+
+    def start_metrics(self):
+        # Worker/command queue health is read from their own stats at scrape time
+        registry.register(Gauge("health_reminder_dispatch_queue_depth", "Pending notification/sound jobs",
+                                func=lambda: dispatcher.stats()["depth"]))
+        registry.register(Gauge("health_reminder_dispatch_dropped", "Notification/sound jobs dropped on overflow",
+                                func=lambda: dispatcher.stats()["dropped"]))
+        registry.register(Gauge("health_reminder_dispatch_latency_p99_seconds", "p99 submit-to-done dispatch latency",
+                                func=lambda: dispatcher.stats()["latency_ms_p99"] / 1000))
+        registry.register(Gauge("health_reminder_command_latency_max_seconds", "Slowest recent post-to-run command latency",
+                                func=lambda: self.commands.stats()["latency_ms_max"] / 1000))
+        if not self.config.metrics_port:
+            return
+        try:
+            self.metrics_server = MetricsServer(registry, self.config.metrics_port)
+        except OSError as e:
+            # Port taken (e.g. a second instance); the tray dump still works
+            log.warning("Metrics endpoint disabled: %s", e)
+            return
+        self.metrics_server.start()
+
+    def start_control(self):
+        try:
+            self.control_server = ControlServer(control_address(self.assets_dir), self.on_control_batch)
+        except OSError as e:
+            log.warning("Control API disabled: %s", e)
+            return
+        self.control_server.start()
+
 if __name__ == "__main__":
-    app = HealthReminderApp()
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    setup_logging(app_dir)
+    app = HealthReminderApp(state_store=StateStore(app_dir), history=EventHistory(app_dir))
     app.start()
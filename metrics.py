@@ -0,0 +1,228 @@
+import bisect
+import os
+import sys
+import threading
+
+# Seconds; fine-grained at the low end where ticks and overlay shows live
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENESS_BUCKETS = (0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0, 300.0, 3600.0)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Gauge:
+    # Either set() from the owning thread or computed at scrape time by `func`
+    def __init__(self, name, help, func=None):
+        self.name = name
+        self.help = help
+        self.func = func
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        if self.func is None:
+            return self._value
+        try:
+            return self.func()
+        except Exception:
+            return float("nan")
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.value()}"]
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self._series = {} # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def quantile(self, q, *labelvalues):
+        # Upper bound of the bucket holding the q-quantile (inf if beyond the last bucket)
+        series = self._series.get(labelvalues)
+        if not series:
+            return 0.0
+        total = sum(series[:-1])
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+            running += bucket_count
+            if running >= q * total:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labelvalues, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, labelvalues, ("le", bound))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes():
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+    import resource
+    # Peak rather than current on macOS/BSD, but close enough for a diagnostic
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class MetricsServer:
+    # Read-only Prometheus text endpoint on localhost: GET /metrics
+    def __init__(self, registry, port, host="127.0.0.1"):
+        # http.server pulls in the email package; keep it off the startup path
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.registry = registry
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_ref.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._stopping = False
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name="MetricsServer", daemon=True).start()
+
+    def stop(self):
+        self._stopping = True
+        try:
+            # The accept loop blocks without a timeout; wake it up
+            import socket
+            socket.create_connection(self.server.server_address, timeout=1).close()
+        except OSError:
+            pass
+        self.server.server_close()
+
+    def _accept_loop(self):
+        # serve_forever() polls for shutdown twice a second; handle_request()
+        # with no timeout set sleeps in select() until a client connects
+        while not self._stopping:
+            self.server.handle_request()
+
+
+registry = Registry()
+
+TICK_SECONDS = registry.register(Histogram(
+    "health_reminder_tick_seconds", "Time spent in one reminder loop tick"))
+FIRING_LATENESS_SECONDS = registry.register(Histogram(
+    "health_reminder_firing_lateness_seconds", "Delay between a reminder's deadline and it firing",
+    buckets=LATENESS_BUCKETS, labelnames=("kind",)))
+OVERLAY_SHOW_SECONDS = registry.register(Histogram(
+    "health_reminder_overlay_show_seconds", "Time to show a fullscreen overlay", labelnames=("overlay",)))
+CONFIG_RELOADS = registry.register(Counter(
+    "health_reminder_config_reloads_total", "Config reloads by result", labelnames=("result",)))
+CONFIG_RELOAD_SECONDS = registry.register(Histogram(
+    "health_reminder_config_reload_seconds", "Time to load and apply config.json"))
+TK_WINDOWS = registry.register(Gauge(
+    "health_reminder_tk_widgets", "Tk widgets alive (sampled on the Tk thread)"))
+RSS_BYTES = registry.register(Gauge(
+    "health_reminder_resident_memory_bytes", "Resident set size of the process", func=process_rss_bytes))
+CONTROL_COMMANDS = registry.register(Counter(
+    "health_reminder_control_commands_total", "Control API commands by command and result",
+    labelnames=("command", "result")))
+TIME_JUMPS = registry.register(Counter(
+    "health_reminder_time_jumps_total", "Detected resumes from suspend and wall-clock steps", labelnames=("kind",)))
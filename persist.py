@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "state.snapshot.json"
+JOURNAL_FILE = "state.journal"
+# Group commit: after the first pending record, wait this long for more
+# before writing and fsyncing them together
+COMMIT_DELAY_SECONDS = 0.25
+# Fold the journal into a new snapshot once it holds this many records, so
+# a restore reads at most one snapshot plus this many lines
+COMPACT_RECORDS = 256
+# With nothing to write, still note that the app is alive this often; the
+# last timestamp on disk tells a restart how long the app was down
+HEARTBEAT_SECONDS = 60
+
+
+class StateStore:
+    # Crash-safe storage for per-schedule state. record() only appends to an
+    # in-memory list; a writer thread appends the records to a JSON-lines
+    # journal in batches (one write + fsync per batch) and periodically
+    # compacts it into an atomically replaced snapshot. Each record holds a
+    # schedule's full state, so replaying is "last record wins" and a torn
+    # final line after a crash is simply dropped.
+    def __init__(self, directory, clock=None, commit_delay=COMMIT_DELAY_SECONDS,
+                 compact_records=COMPACT_RECORDS, heartbeat=HEARTBEAT_SECONDS):
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.time = clock.time if clock is not None else time.time
+        self.commit_delay = commit_delay
+        self.compact_records = compact_records
+        self.heartbeat = heartbeat
+        self._states = {}
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._journal_records = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+        self.last_seen = None
+        self.commits = 0
+        self.compactions = 0
+
+    def load(self):
+        # Returns {schedule key: state dict} and sets last_seen to the newest
+        # timestamp on disk (None on first run)
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._states = snapshot["states"]
+            self._snapshot_seq = self._seq = snapshot["seq"]
+            self.last_seen = snapshot["t"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning("Ignoring unreadable state snapshot: %s", e)
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for number, line in enumerate(f, 1):
+                    try:
+                        record = json.loads(line)
+                        seq, t = record["seq"], record["t"]
+                        key, state = (record["key"], record["state"]) if "key" in record else (None, None)
+                        already_folded = seq <= self._snapshot_seq
+                        last_seen = max(self.last_seen or 0, t)
+                    except ValueError:
+                        break # torn write from a crash: everything after it is lost anyway
+                    except (KeyError, TypeError) as e:
+                        # Valid JSON but not a record: stop replaying here, like a torn write
+                        log.warning("Ignoring state journal from line %d on: not a record (%r)", number, e)
+                        break
+                    self._journal_records += 1
+                    if already_folded:
+                        continue # already folded into the snapshot
+                    self._seq = seq
+                    self.last_seen = last_seen
+                    if key is not None:
+                        self._states[key] = state
+        except FileNotFoundError:
+            pass
+        return dict(self._states)
+
+    def record(self, key, state, now):
+        # Called from the Tk thread: no I/O here
+        with self._lock:
+            self._seq += 1
+            self._pending.append({"seq": self._seq, "t": now, "key": key, "state": state})
+        self._wake.set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="StateStore", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        # Writes whatever is pending and compacts; blocks until done
+        self._stop = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self.flush()
+        try:
+            self._compact()
+        except OSError as e:
+            log.error("Could not persist state: %s", e)
+
+    def _run(self):
+        while not self._stop:
+            if not self._wake.wait(self.heartbeat):
+                with self._lock:
+                    self._seq += 1
+                    self._pending.append({"seq": self._seq, "t": self.time()})
+            elif not self._stop:
+                time.sleep(self.commit_delay)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        # One group commit (plus compaction when due); the writer thread's
+        # unit of work, also callable directly when no thread is running
+        try:
+            self._commit()
+            if self._journal_records >= self.compact_records:
+                self._compact()
+        except OSError as e:
+            log.error("Could not persist state: %s", e)
+
+    def _commit(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in batch)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        for record in batch:
+            if "key" in record:
+                self._states[record["key"]] = record["state"]
+            self.last_seen = max(self.last_seen or 0, record["t"])
+        self._journal_records += len(batch)
+        self.commits += 1
+
+    def _compact(self):
+        # Snapshot first, then truncate: a crash in between leaves journal
+        # records at or below the snapshot's seq, which load() skips
+        if self._journal_records == 0:
+            return
+        with self._lock:
+            # Everything with seq <= this has been committed by _commit
+            seq = self._seq - len(self._pending)
+        snapshot = {"seq": seq, "t": self.last_seen, "states": self._states}
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        open(self.journal_path, "w").close()
+        self._snapshot_seq = seq
+        self._journal_records = 0
+        self.compactions += 1
@@ -0,0 +1,221 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+# Event kinds for rule-driven reminders (see engine.ReminderEvent)
+WATER = "water"
+MEAL = "meal"
+CUSTOM = "rule"
+
+# Names the built-in reminders and the engine's own scheduler entries
+# ("resume" ends a pause) use; config rules can't take them
+RESERVED_NAMES = ("pomodoro", "resume", WATER, MEAL)
+
+# Upper bound on calendar steps when searching a cron rule's next fire time
+# (enough for "Feb 29 only" rules), so an impossible rule can't loop forever
+MAX_CRON_STEPS = 4000
+
+
+class Rule:
+    # Compiled reminder rule. next_after(t) returns (deadline, label) for the
+    # first fire strictly after t, or None if it never fires again. Rules
+    # are immutable and compare equal when their definitions match, which is
+    # how a config reload finds the rules that actually changed.
+    __slots__ = ("name", "kind", "title", "message")
+    # Interval rules count from when they last fired, calendar rules from
+    # the deadline they fired for
+    anchor_on_fire = "deadline"
+
+    def __init__(self, name, kind, title, message):
+        self.name = name
+        self.kind = kind
+        self.title = title
+        self.message = message
+
+    def _spec(self):
+        return tuple(getattr(self, slot) for cls in type(self).__mro__ for slot in getattr(cls, "__slots__", ()))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._spec() == other._spec()
+
+    __hash__ = None
+
+
+class IntervalRule(Rule):
+    __slots__ = ("seconds",)
+    anchor_on_fire = "fired"
+
+    def __init__(self, name, kind, title, message, seconds):
+        super().__init__(name, kind, title, message)
+        self.seconds = seconds
+
+    def next_after(self, t):
+        return t + self.seconds, None
+
+
+class DailyTimesRule(Rule):
+    # Fixed times of day, e.g. the meal timings: a sorted minute-of-day tuple
+    # searched with bisect. Times are matched on the local wall clock, not as
+    # minutes elapsed since midnight, so DST days (23 or 25 hours) keep them
+    # at the right hour: a time the clocks skip (02:30) fires an hour later,
+    # and a time that occurs twice fires on its first pass only.
+    __slots__ = ("minutes", "labels")
+
+    def __init__(self, name, kind, title, message, minutes):
+        super().__init__(name, kind, title, message)
+        self.minutes = tuple(sorted(set(minutes)))
+        self.labels = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in self.minutes)
+
+    def next_after(self, t):
+        if not self.minutes:
+            return None
+        local = datetime.fromtimestamp(t)
+        day = datetime(local.year, local.month, local.day)
+        index = bisect_right(self.minutes, local.hour * 60 + local.minute + (local.second + local.microsecond / 1e6) / 60)
+        # A candidate can still land at or before t around a DST change (the
+        # repeated hour); move on to the next one. Bounded: every time of the
+        # next day is past t.
+        for _ in range(2 * len(self.minutes) + 1):
+            if index == len(self.minutes):
+                day += timedelta(days=1)
+                index = 0
+            deadline = _local_timestamp(day + timedelta(minutes=self.minutes[index]), t)
+            if deadline is not None:
+                return deadline, self.labels[index]
+            index += 1
+        return None
+
+
+class CronRule(Rule):
+    # Classic 5-field cron expression (minute hour day-of-month month
+    # day-of-week, local time). Each field compiles to a sorted tuple, so
+    # finding the next match is a bisect per field rather than a
+    # minute-by-minute scan.
+    __slots__ = ("expr", "minutes", "hours", "days", "months", "weekdays", "any_day", "any_weekday")
+
+    def __init__(self, name, kind, title, message, expr):
+        super().__init__(name, kind, title, message)
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression {expr!r} needs 5 fields")
+        self.expr = expr
+        self.minutes = _cron_field(fields[0], 0, 59)
+        self.hours = _cron_field(fields[1], 0, 23)
+        self.days = _cron_field(fields[2], 1, 31)
+        self.months = _cron_field(fields[3], 1, 12)
+        # 0 and 7 are both Sunday; stored as Python weekdays (Monday = 0)
+        self.weekdays = tuple(sorted({(d - 1) % 7 for d in _cron_field(fields[4], 0, 7)}))
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, dt):
+        # Standard cron: if both day fields are restricted, either may match
+        if self.any_day:
+            return self.any_weekday or dt.weekday() in self.weekdays
+        if self.any_weekday:
+            return dt.day in self.days
+        return dt.day in self.days or dt.weekday() in self.weekdays
+
+    def next_after(self, t):
+        dt = datetime.fromtimestamp(t).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(MAX_CRON_STEPS):
+            if dt.month not in self.months:
+                index = bisect_left(self.months, dt.month)
+                year = dt.year if index < len(self.months) else dt.year + 1
+                dt = datetime(year, self.months[index % len(self.months)], 1)
+                continue
+            if not self._day_matches(dt):
+                if self.any_weekday:
+                    # Jump straight to the next listed day of the month
+                    index = bisect_right(self.days, dt.day)
+                    if index < len(self.days) and self.days[index] <= _days_in_month(dt):
+                        dt = datetime(dt.year, dt.month, self.days[index])
+                        continue
+                    dt = _first_of_next_month(dt)
+                else:
+                    dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+                continue
+            index = bisect_left(self.hours, dt.hour)
+            if index == len(self.hours):
+                dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+                continue
+            if self.hours[index] != dt.hour:
+                dt = dt.replace(hour=self.hours[index], minute=0)
+            index = bisect_left(self.minutes, dt.minute)
+            if index == len(self.minutes):
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            dt = dt.replace(minute=self.minutes[index])
+            deadline = _local_timestamp(dt, t)
+            if deadline is None:
+                # Already passed: the repeated hour when clocks go back
+                dt += timedelta(minutes=1)
+                continue
+            return deadline, f"{dt.hour:02d}:{dt.minute:02d}"
+        return None
+
+
+def _local_timestamp(dt, t):
+    # Timestamp of naive local time `dt` if it is after t, else None. Of an
+    # hour that occurs twice (clocks going back) the first pass is used, or
+    # the second if the first is not after t; a skipped time (clocks going
+    # forward) is read with the offset from before the jump, i.e. an hour on.
+    for fold in (0, 1):
+        ts = dt.replace(fold=fold).timestamp()
+        if ts > t:
+            return ts
+    return None
+
+
+def _days_in_month(dt):
+    return (_first_of_next_month(dt) - timedelta(days=1)).day
+
+
+def _first_of_next_month(dt):
+    return datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1)
+
+
+def _cron_field(field, low, high):
+    # "*", "5", "1-5", "*/15", "9-17/2" and comma-separated lists of those
+    values = set()
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        try:
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = map(int, spec.split("-"))
+            else:
+                start = end = int(spec)
+        except ValueError:
+            raise ValueError(f"invalid cron field {field!r}")
+        if step < 1 or not (low <= start <= end <= high):
+            raise ValueError(f"cron field {field!r} out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+def compile_rule(spec):
+    # One entry of config.json "rules" -> Rule. Either "every_minutes" or
+    # "cron" sets the timing; "title" and "message" are shown on screen.
+    if not isinstance(spec, dict):
+        raise ValueError("each rule must be an object")
+    name = spec.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError("rule needs a non-empty \"name\"")
+    if name in RESERVED_NAMES:
+        raise ValueError(f"rule name {name!r} is reserved")
+    title = spec.get("title", name)
+    message = spec.get("message", "")
+    if not isinstance(title, str) or not isinstance(message, str):
+        raise ValueError(f"rule {name!r}: title and message must be strings")
+    if ("every_minutes" in spec) == ("cron" in spec):
+        raise ValueError(f"rule {name!r} needs exactly one of \"every_minutes\" or \"cron\"")
+    if "cron" in spec:
+        if not isinstance(spec["cron"], str):
+            raise ValueError(f"rule {name!r}: cron must be a string")
+        return CronRule(name, CUSTOM, title, message, spec["cron"])
+    minutes = spec["every_minutes"]
+    if isinstance(minutes, bool) or not isinstance(minutes, (int, float)) or minutes <= 0:
+        raise ValueError(f"rule {name!r}: every_minutes must be a positive number")
+    return IntervalRule(name, CUSTOM, title, message, minutes * 60)
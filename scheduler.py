@@ -0,0 +1,63 @@
+import heapq
+import itertools
+
+
+class DeadlineScheduler:
+    # Min-heap of (deadline, seq, key). Each key has at most one live deadline;
+    # rescheduling or cancelling just updates the index and the stale heap
+    # entries are discarded lazily when they reach the top.
+    def __init__(self):
+        self._heap = []
+        self._live = {}  # key -> (deadline, seq)
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._live)
+
+    def __contains__(self, key):
+        return key in self._live
+
+    def schedule(self, key, deadline):
+        seq = next(self._seq)
+        self._live[key] = (deadline, seq)
+        heapq.heappush(self._heap, (deadline, seq, key))
+        # Keep the heap from filling up with stale entries on long runs
+        if len(self._heap) > 64 and len(self._heap) > 4 * len(self._live):
+            self._compact()
+
+    def cancel(self, key):
+        self._live.pop(key, None)
+
+    def deadline(self, key):
+        entry = self._live.get(key)
+        return entry[0] if entry else None
+
+    def next_deadline(self):
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        # Returns (key, deadline) for every entry due at `now`, earliest first
+        due = []
+        heap = self._heap
+        while heap:
+            deadline, seq, key = heap[0]
+            if deadline > now:
+                break
+            heapq.heappop(heap)
+            if self._live.get(key) == (deadline, seq):
+                del self._live[key]
+                due.append((key, deadline))
+        return due
+
+    def _prune(self):
+        heap = self._heap
+        while heap:
+            deadline, seq, key = heap[0]
+            if self._live.get(key) == (deadline, seq):
+                return
+            heapq.heappop(heap)
+
+    def _compact(self):
+        self._heap = [(d, s, k) for k, (d, s) in self._live.items()]
+        heapq.heapify(self._heap)
@@ -0,0 +1,179 @@
+import copy
+
+from rules import IntervalRule, DailyTimesRule, compile_rule, WATER, MEAL
+
+# Used for any section/key missing from config.json
+DEFAULT_CONFIG = {
+    "pomodoro": {
+        "work_minutes": 25,
+        "break_minutes": 5,
+        "enabled": True,
+        "overlay": True
+    },
+    "water": {
+        "interval_minutes": 45,
+        "enabled": True
+    },
+    "meals": {
+        "timings": [],
+        "enabled": True
+    },
+    "rules": [],
+    "diagnostics": {
+        "metrics_port": 0
+    },
+    "catch_up": "collapse",
+    "auto_start": False
+}
+
+# What happens to reminders that came due while the machine slept (or the
+# app was not running); see ReminderEngine.catch_up
+CATCH_UP_POLICIES = ("collapse", "skip", "fire_once")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _section(raw, name):
+    section = dict(DEFAULT_CONFIG[name])
+    value = raw.get(name, {})
+    if not isinstance(value, dict):
+        raise ConfigError(f"'{name}' must be an object")
+    section.update(value)
+    return section
+
+
+def _positive_minutes(section, name, key):
+    value = section[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ConfigError(f"{name}.{key} must be a positive number, got {value!r}")
+    return value
+
+
+def _flag(section, name, key):
+    value = section[key]
+    if not isinstance(value, bool):
+        raise ConfigError(f"{name}.{key} must be true or false, got {value!r}")
+    return value
+
+
+def _port(section, name, key):
+    value = section[key]
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 65535:
+        raise ConfigError(f"{name}.{key} must be a port number (0 disables), got {value!r}")
+    return value
+
+
+def parse_meal_minutes(timings):
+    # "HH:MM" strings -> sorted minute-of-day tuple (rules.DailyTimesRule
+    # builds the labels)
+    parsed = set()
+    for timing in timings:
+        try:
+            hour, minute = map(int, timing.split(":"))
+        except (AttributeError, ValueError):
+            raise ConfigError(f"Invalid meal time {timing!r}, expected HH:MM")
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ConfigError(f"Invalid meal time {timing!r}, expected HH:MM")
+        parsed.add(hour * 60 + minute)
+    return tuple(sorted(parsed))
+
+
+_SECTION_FIELDS = {
+    "pomodoro": ("pomodoro_enabled", "pomodoro_overlay", "work_minutes", "break_minutes"),
+    "water": ("water_enabled", "water_interval"),
+    "meals": ("meals_enabled", "meal_minutes"),
+    "rules": ("custom_rules",),
+    "catch_up": ("catch_up",),
+    "auto_start": ("auto_start",),
+}
+
+
+class ConfigSnapshot:
+    # Validated, read-only view of config.json. Everything the reminder loop
+    # needs is pre-computed once here so per-tick access is a plain attribute
+    # lookup: durations are in seconds, and water, meals and the custom
+    # "rules" entries are compiled into rules.Rule objects (`rules`, keyed by
+    # name in `rule_map`) that the engine schedules generically.
+    __slots__ = (
+        "_raw",
+        "pomodoro_enabled", "pomodoro_overlay", "work_minutes", "break_minutes", "work_seconds", "break_seconds",
+        "water_enabled", "water_interval",
+        "meals_enabled", "meal_minutes",
+        "auto_start", "metrics_port", "catch_up",
+        "custom_rules", "rules", "rule_map",
+    )
+
+    def __init__(self, raw):
+        if not isinstance(raw, dict):
+            raise ConfigError("config must be a JSON object")
+        pomodoro = _section(raw, "pomodoro")
+        water = _section(raw, "water")
+        meals = _section(raw, "meals")
+        diagnostics = _section(raw, "diagnostics")
+        if not isinstance(meals["timings"], list):
+            raise ConfigError("meals.timings must be a list of HH:MM strings")
+        rule_specs = raw.get("rules", DEFAULT_CONFIG["rules"])
+        if not isinstance(rule_specs, list):
+            raise ConfigError("rules must be a list")
+        catch_up = raw.get("catch_up", DEFAULT_CONFIG["catch_up"])
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ConfigError(f"catch_up must be one of {', '.join(CATCH_UP_POLICIES)}, got {catch_up!r}")
+
+        values = {
+            "_raw": copy.deepcopy(raw),
+            "pomodoro_enabled": _flag(pomodoro, "pomodoro", "enabled"),
+            # The always-on-top countdown window; the tray icon shows the minutes either way
+            "pomodoro_overlay": _flag(pomodoro, "pomodoro", "overlay"),
+            "work_minutes": _positive_minutes(pomodoro, "pomodoro", "work_minutes"),
+            "break_minutes": _positive_minutes(pomodoro, "pomodoro", "break_minutes"),
+            "water_enabled": _flag(water, "water", "enabled"),
+            "water_interval": _positive_minutes(water, "water", "interval_minutes") * 60,
+            "meals_enabled": _flag(meals, "meals", "enabled"),
+            "auto_start": bool(raw.get("auto_start", DEFAULT_CONFIG["auto_start"])),
+            "metrics_port": _port(diagnostics, "diagnostics", "metrics_port"),
+            "catch_up": catch_up,
+        }
+        values["work_seconds"] = values["work_minutes"] * 60
+        values["break_seconds"] = values["break_minutes"] * 60
+        values["meal_minutes"] = parse_meal_minutes(meals["timings"])
+
+        custom = []
+        for index, spec in enumerate(rule_specs):
+            if isinstance(spec, dict) and spec.get("enabled", True) is False:
+                continue
+            try:
+                custom.append(compile_rule(spec))
+            except ValueError as e:
+                raise ConfigError(f"rules[{index}]: {e}")
+        builtin = []
+        if values["water_enabled"]:
+            builtin.append(IntervalRule(WATER, WATER, "Water Reminder", "Time to drink some water!",
+                                        values["water_interval"]))
+        if values["meals_enabled"] and values["meal_minutes"]:
+            builtin.append(DailyTimesRule(MEAL, MEAL, "Meal Time", "Time for your scheduled meal.",
+                                          values["meal_minutes"]))
+        values["custom_rules"] = tuple(custom)
+        values["rules"] = tuple(builtin + custom)
+        values["rule_map"] = {rule.name: rule for rule in values["rules"]}
+        if len(values["rule_map"]) != len(values["rules"]):
+            raise ConfigError("rule names must be unique")
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only")
+
+    def changed_sections(self, other):
+        # Names of the sections that differ between two snapshots, so a reload
+        # can be applied as a diff instead of resetting everything
+        changed = set()
+        for section, fields in _SECTION_FIELDS.items():
+            if any(getattr(self, f) != getattr(other, f) for f in fields):
+                changed.add(section)
+        return changed
+
+    def to_dict(self):
+        # A fresh, editable copy of the JSON this snapshot was built from
+        return copy.deepcopy(self._raw)
@@ -0,0 +1,266 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+import types
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+
+from analytics import Aggregates
+from backends import XdgBackend, AutostartService
+from clock import VirtualClock
+from engine import ReminderEngine, BREAK_DUE
+from headless import HeadlessUI
+from history import EventHistory, REMINDERS, ACTIONS
+from main import HealthReminderApp, TRAY_STATES, TRAY_LABELS
+from settings import ConfigSnapshot, ConfigError
+from trayicon import TrayIconRenderer, STATE_COLORS
+
+CONFIG = {
+    "pomodoro": {"work_minutes": 25, "break_minutes": 5, "enabled": True},
+    "water": {"interval_minutes": 45, "enabled": True},
+    "meals": {"timings": ["09:10", "13:30", "20:10"], "enabled": True},
+    "rules": [{"name": "stretch", "cron": "0 * * * *", "title": "Stretch"}],
+    "auto_start": False,
+}
+START = datetime(2026, 1, 5, 10, 50).timestamp() # a Monday
+
+
+def make_app(clock, policy="collapse", meals=None, wall_timers=False):
+    # Headless app whose break prompts are answered after 10 s; returns the
+    # app and a list collecting (steady time, kind, event), with kind
+    # "summary" (and no event) for the fire_once Welcome Back message
+    data = dict(CONFIG, catch_up=policy)
+    if meals is not None:
+        data["meals"] = {"timings": meals, "enabled": True}
+    app = HealthReminderApp(clock=clock, ui=HeadlessUI(clock, wall_timers), config=ConfigSnapshot(data))
+    seen = []
+    handle_event, show_message = app.handle_event, app.overlays.show_message
+
+    def record(event):
+        seen.append((clock.monotonic(), event.kind, event))
+        handle_event(event)
+
+    def message(title, *args, **kwargs):
+        if title == "Welcome Back":
+            seen.append((clock.monotonic(), "summary", None))
+        show_message(title, *args, **kwargs)
+    app.handle_event, app.overlays.show_message = record, message
+    app.overlays.break_confirm.responder = lambda prompt: app.root.after(10000, prompt.start_break)
+    return app, seen
+
+
+def break_due_after(seen, began):
+    due = next((t for t, kind, event in seen if kind == "break_due"), None)
+    return None if due is None else due - began
+
+
+class QuietTestCase(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING) # the app logs every detected jump
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+
+class TimeJumpTest(QuietTestCase):
+    def test_catch_up_after_suspend(self):
+        for hours in (0.25, 3, 14):
+            for policy in ("collapse", "skip", "fire_once"):
+                with self.subTest(hours=hours, policy=policy):
+                    clock = VirtualClock(START)
+                    app, seen = make_app(clock, policy)
+                    app.tick()
+                    app.root.run_until(clock.time() + 60)
+                    clock.suspend(hours * 3600)
+                    woke = clock.monotonic()
+                    app.root.run_until(clock.time() + 300)
+                    after = Counter(kind for t, kind, event in seen if t >= woke)
+                    fires = Counter((kind, event.rule) for t, kind, event in seen if t >= woke and event)
+                    if policy == "collapse":
+                        self.assertLessEqual(max(fires.values(), default=0), 1, after)
+                    elif policy == "skip":
+                        self.assertEqual(after, {})
+                    else:
+                        self.assertEqual(after, {"summary": 1})
+
+    def test_work_block_keeps_its_length_across_a_clock_step(self):
+        for step in (60, -60):
+            with self.subTest(step=step):
+                clock = VirtualClock(START)
+                app, seen = make_app(clock)
+                began = clock.monotonic()
+                app.tick()
+                app.root.run_until(clock.time() + 300)
+                clock.step(step * 60)
+                app.root.run_until(clock.time() + 3600)
+                self.assertAlmostEqual(break_due_after(seen, began), 25 * 60, delta=2)
+
+    def test_watchdog_wakes_a_tick_held_back_by_a_clock_step(self):
+        # With Tcl 8.6's wall-clock `after`, setting the clock back stalls the
+        # pending tick; the loop runs in 5 s slices, each followed by what the
+        # watchdog thread does
+        for watchdog in (False, True):
+            with self.subTest(watchdog=watchdog):
+                clock = VirtualClock(START)
+                app, seen = make_app(clock, wall_timers=True)
+                began = clock.monotonic()
+                app.tick()
+                app.root.run_until(clock.time() + 300)
+                clock.step(-3600)
+                for _ in range(720):
+                    app.root.run_until(clock.time() + 5)
+                    if watchdog and app.tick_overdue():
+                        app.wake()
+                if watchdog:
+                    self.assertAlmostEqual(break_due_after(seen, began), 25 * 60, delta=2)
+                else:
+                    self.assertIsNone(break_due_after(seen, began))
+
+    @unittest.skipUnless(hasattr(time, "tzset"), "needs time.tzset")
+    def test_meals_fire_once_per_day_across_dst_changes(self):
+        saved_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+        try:
+            for day in ((2026, 3, 7), (2026, 10, 31)):
+                with self.subTest(day=day):
+                    self.check_meals(day, ("01:30", "02:30", "13:00"))
+        finally:
+            if saved_tz is None:
+                del os.environ["TZ"]
+            else:
+                os.environ["TZ"] = saved_tz
+            time.tzset()
+
+    def check_meals(self, day, labels):
+        clock = VirtualClock(datetime(*day, 12, 0).timestamp())
+        app, seen = make_app(clock, meals=list(labels))
+        app.tick()
+        app.root.run_until(clock.time() + 3 * 86400 - 1800) # ends clear of a meal time
+        fires = Counter((time.strftime("%m-%d", time.localtime(event.deadline)), event.detail)
+                        for t, kind, event in seen if kind == "meal")
+        # Every meal time in the window, including the skipped 02:30 in
+        # spring and the repeated 01:30 in autumn
+        end = datetime.fromtimestamp(clock.time())
+        expected = set()
+        for offset in range(4):
+            date = datetime(*day) + timedelta(days=offset)
+            for label in labels:
+                hour, minute = map(int, label.split(":"))
+                if datetime(*day, 12, 0) <= date.replace(hour=hour, minute=minute) < end:
+                    expected.add((date.strftime("%m-%d"), label))
+        self.assertEqual(max(fires.values()), 1, fires)
+        self.assertEqual(set(fires), expected)
+
+
+class TrayTest(QuietTestCase):
+    def test_every_tray_state_renders(self):
+        renderer = TrayIconRenderer()
+        for state in set(TRAY_STATES.values()) | set(TRAY_LABELS):
+            with self.subTest(state=state):
+                self.assertIn(state, STATE_COLORS)
+                renderer.render((state, "5"))
+
+    def test_pause_shows_in_tray(self):
+        clock = VirtualClock(START)
+        app, seen = make_app(clock)
+        app.icon = types.SimpleNamespace(icon=None, title=None) # stands in for the pystray icon
+        app.tick()
+        replies = []
+        app.run_control_batch([{"cmd": "pause", "minutes": 30}], replies, types.SimpleNamespace(set=lambda: None))
+        app.root.run_until(clock.time() + 1)
+        self.assertTrue(replies[0]["ok"], replies)
+        self.assertEqual(app.icon.title, "Health Reminder - Paused: 30 min left")
+        self.assertIs(app.icon.icon, app.tray_renderer.render(("paused", "30")))
+
+
+class RulesTest(unittest.TestCase):
+    def test_reserved_names_are_rejected(self):
+        # Rule names share the scheduler's key space with the engine's own entries
+        for name in ("pomodoro", "resume", "water", "meal"):
+            with self.subTest(name=name), self.assertRaises(ConfigError):
+                ConfigSnapshot({"rules": [{"name": name, "every_minutes": 1}]})
+
+
+class EngineTest(unittest.TestCase):
+    def test_reenabled_pomodoro_starts_a_fresh_block(self):
+        engine = ReminderEngine()
+        on, off = ConfigSnapshot(CONFIG), ConfigSnapshot(dict(CONFIG, pomodoro={"enabled": False}))
+        engine.add_schedule("k", on, START)
+        engine.update_config("k", off, START + 60)
+        now = START + 5 * 3600
+        engine.update_config("k", on, now)
+        self.assertNotIn(BREAK_DUE, [event.kind for event in engine.poll(now)])
+        self.assertEqual(engine.scheduler.deadline(("k", "pomodoro")), now + 25 * 60)
+
+
+class AnalyticsTest(unittest.TestCase):
+    def test_incremental_update_matches_a_rebuild(self):
+        directory = tempfile.mkdtemp(prefix="health_reminder_history_")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        history = EventHistory(directory)
+
+        def record(first, count):
+            for i in range(first, first + count):
+                history.record(f"user{i % 3}", REMINDERS[i % len(REMINDERS)], ACTIONS[i % len(ACTIONS)],
+                               START + i * 600, i % 7)
+            history.flush()
+        record(0, 500)
+        aggregates = Aggregates(directory)
+        aggregates.update()
+        record(500, 200)
+        self.assertEqual(aggregates.update(), 200)
+        os.remove(aggregates.cache_path)
+        scratch = Aggregates(directory)
+        scratch.update(save=False)
+        self.assertEqual(scratch.keys.tolist(), aggregates.keys.tolist())
+        self.assertEqual(scratch.counts.tolist(), aggregates.counts.tolist())
+
+
+class XdgAutostartTest(unittest.TestCase):
+    def setUp(self):
+        self.config_home = tempfile.mkdtemp(prefix="health_reminder_xdg_")
+        self.addCleanup(shutil.rmtree, self.config_home, ignore_errors=True)
+        self.backend = XdgBackend(self.config_home)
+
+    def test_enable_and_disable(self):
+        backend = self.backend
+        self.assertTrue(backend.desktop_file.startswith(os.path.join(self.config_home, "autostart")))
+        self.assertFalse(backend.is_autostart_enabled())
+        self.assertTrue(backend.set_autostart(True))
+        self.assertTrue(backend.is_autostart_enabled())
+        with open(backend.desktop_file) as f:
+            entry = f.read()
+        self.assertTrue(entry.startswith("[Desktop Entry]\n"), entry)
+        self.assertIn("\nExec=", entry)
+        self.assertTrue(backend.set_autostart(False))
+        self.assertFalse(os.path.exists(backend.desktop_file))
+        self.assertTrue(backend.set_autostart(False)) # already off
+
+    def test_entry_disabled_in_place(self):
+        self.backend.set_autostart(True)
+        with open(self.backend.desktop_file) as f:
+            entry = f.read()
+        for disabled in ("Hidden=true", "X-GNOME-Autostart-enabled=false"):
+            with self.subTest(disabled=disabled):
+                with open(self.backend.desktop_file, "w") as f:
+                    f.write(entry.replace("X-GNOME-Autostart-enabled=true", disabled))
+                self.assertFalse(self.backend.is_autostart_enabled())
+
+    def test_service(self):
+        service = AutostartService(self.backend)
+        service.sync(True)
+        self.assertTrue(service.enabled() and self.backend.is_autostart_enabled())
+        self.assertTrue(service.set(False))
+        self.assertFalse(service.enabled() or self.backend.is_autostart_enabled())
+
+    def test_current_asks_the_os_before_the_first_refresh(self):
+        self.backend.set_autostart(True)
+        service = AutostartService(self.backend)
+        self.assertFalse(service.enabled()) # nothing cached yet
+        self.assertTrue(service.current())
+
+
+if __name__ == "__main__":
+    unittest.main()
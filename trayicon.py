@@ -0,0 +1,91 @@
+from collections import OrderedDict
+
+ICON_SIZE = 64
+MAX_CACHED = 16
+
+# Background colour per displayed state
+STATE_COLORS = {
+    "work": (0, 200, 0),
+    "snooze": (255, 152, 0),
+    "break": (33, 150, 243),
+    "pending": (244, 67, 54),
+    "idle": (120, 120, 120),
+    "paused": (96, 125, 139),
+}
+
+# Seven-segment layout: which segments (a-g) each digit lights
+_SEGMENTS = {
+    "0": "abcdef", "1": "bc", "2": "abdeg", "3": "abcdg", "4": "bcfg",
+    "5": "acdfg", "6": "acdefg", "7": "abc", "8": "abcdefg", "9": "abcdfg",
+}
+GLYPH_WIDTH = 20
+GLYPH_HEIGHT = 34
+STROKE = 5
+
+
+class TrayIconRenderer:
+    # Builds tray icons showing the pomodoro state (background colour) and
+    # the remaining minutes. The state backgrounds and digit masks are drawn
+    # once into an atlas; an icon is then a copy of a background with up to
+    # two digit masks pasted on, and recent icons are cached by (state, text).
+    def __init__(self, size=ICON_SIZE):
+        self.size = size
+        self._backgrounds = None
+        self._glyphs = None
+        self._cache = OrderedDict()
+        self.rendered = 0
+
+    def _build_atlas(self):
+        from PIL import Image, ImageDraw # deferred: only needed once the tray starts
+        self._backgrounds = {}
+        for state, color in STATE_COLORS.items():
+            image = Image.new("RGBA", (self.size, self.size), (0, 0, 0, 0))
+            ImageDraw.Draw(image).ellipse([2, 2, self.size - 3, self.size - 3], fill=color + (255,))
+            self._backgrounds[state] = image
+        w, h, s = GLYPH_WIDTH, GLYPH_HEIGHT, STROKE
+        mid = (h - s) // 2
+        boxes = {
+            "a": (0, 0, w, s), "d": (0, h - s, w, h), "g": (0, mid, w, mid + s),
+            "f": (0, 0, s, mid + s), "b": (w - s, 0, w, mid + s),
+            "e": (0, mid, s, h), "c": (w - s, mid, w, h),
+        }
+        self._glyphs = {}
+        for digit, segments in _SEGMENTS.items():
+            mask = Image.new("L", (w, h), 0)
+            draw = ImageDraw.Draw(mask)
+            for segment in segments:
+                x0, y0, x1, y1 = boxes[segment]
+                draw.rectangle([x0, y0, x1 - 1, y1 - 1], fill=255)
+            self._glyphs[digit] = mask
+
+    def render(self, key):
+        # key is (state, text) as returned by icon_key(); text is 0-2 digits
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+            return image
+        if self._backgrounds is None:
+            self._build_atlas()
+        state, text = key
+        image = self._backgrounds[state].copy()
+        gap = 4
+        total = len(text) * GLYPH_WIDTH + max(0, len(text) - 1) * gap
+        x = (self.size - total) // 2
+        y = (self.size - GLYPH_HEIGHT) // 2
+        for digit in text:
+            image.paste((255, 255, 255, 255), (x, y), self._glyphs[digit])
+            x += GLYPH_WIDTH + gap
+        self._cache[key] = image
+        if len(self._cache) > MAX_CACHED:
+            self._cache.popitem(last=False)
+        self.rendered += 1
+        return image
+
+
+def icon_key(state, remaining_seconds):
+    # What the tray shows: a state name plus whole minutes left, rounded up so
+    # "1" is shown during the last minute
+    if state in ("pending", "idle"):
+        return state, ""
+    minutes = min(99, -(-int(remaining_seconds) // 60))
+    return state, str(minutes)
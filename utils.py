@@ -1,147 +1,164 @@
 import json
 import os
-from plyer import notification
-import winreg
-import sys
-import winsound
-from PIL import Image, ImageTk
+import time
+from settings import ConfigSnapshot
+from watcher import mark_own_write
+from assets import icon_cache
+from dispatch import dispatcher
+from metrics import OVERLAY_SHOW_SECONDS
+
+MESSAGE_ICON_SIZE = (250, 250)
+BREAK_ICON_SIZE = (200, 200)
 
 
 def load_config():
+    # Returns a validated, read-only ConfigSnapshot; raises ConfigError
+    # (a ValueError) if the file is malformed
     config_path = os.path.join(os.path.dirname(__file__), 'config.json')
     if os.path.exists(config_path):
         with open(config_path, 'r') as f:
-            return json.load(f)
-    return {}
+            return ConfigSnapshot(json.load(f))
+    return ConfigSnapshot({})
 
 def save_config(config):
     config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-    with open(config_path, 'w') as f:
+    if isinstance(config, ConfigSnapshot):
+        config = config.to_dict()
+    # Write to a temp file and rename so readers never see a half-written file
+    tmp_path = config_path + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(config, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, config_path)
+    mark_own_write(config_path)
 
 def notify(title, message):
-    notification.notify(
-        title=title,
-        message=message,
-        app_name="Health Reminder",
-        timeout=10
-    )
-
-def set_autostart(enabled=True):
-    app_name = "HealthReminderApp"
-    script_path = os.path.abspath(sys.argv[0])
-    # For python scripts, we need to run it with pythonw.exe to avoid terminal window
-    python_exe = sys.executable
-    if python_exe.lower().endswith("python.exe"):
-        python_path = python_exe.replace("python.exe", "pythonw.exe")
-    else:
-        python_path = python_exe
-        
-    cmd = f'"{python_path}" "{script_path}"'
-    
-    key = winreg.HKEY_CURRENT_USER
-    key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
-    
-    try:
-        reg_key = winreg.OpenKey(key, key_path, 0, winreg.KEY_SET_VALUE)
-        if enabled:
-            winreg.SetValueEx(reg_key, app_name, 0, winreg.REG_SZ, cmd)
-        else:
-            try:
-                winreg.DeleteValue(reg_key, app_name)
-            except FileNotFoundError:
-                pass
-        winreg.CloseKey(reg_key)
-        return True
-    except Exception as e:
-        print(f"Error setting autostart: {e}")
-        return False
+    # Queued; the OS call happens on a dispatcher worker thread
+    dispatcher.notify(title, message)
 
 import tkinter as tk
 from tkinter import font as tkfont
+from collections import deque
 
-def show_fullscreen_message(root, title, message, icon_path=None, duration_seconds=10):
-    def close_window(event=None):
-        if window.winfo_exists():
-            window.destroy()
-
-    # Play a subtle notification sound
-    try:
-        winsound.PlaySound("SystemAsterisk", winsound.SND_ALIAS | winsound.SND_ASYNC)
-    except Exception:
-        pass
-
+def _fullscreen_window(root, bg):
+    # Pre-built, initially hidden, borderless topmost window covering the screen
     window = tk.Toplevel(root)
-    
-    # Get screen dimensions
+    window.withdraw()
     screen_width = window.winfo_screenwidth()
     screen_height = window.winfo_screenheight()
-    
-    # Set geometry to cover the entire screen
     window.geometry(f"{screen_width}x{screen_height}+0+0")
-    
-    # Remove window decorations
     window.overrideredirect(True)
     window.attributes("-topmost", True)
-    
-    window.configure(bg='#121212') # Dark background
-    
-    # Ensure it's on top
-    window.lift()
-    window.focus_force()
-    
-    # Allow clicking to dismiss
-    window.bind("<Button-1>", close_window)
-    window.bind("<Escape>", close_window)
-
-    frame = tk.Frame(window, bg='#121212')
-    frame.place(relx=0.5, rely=0.5, anchor='center')
-
-    # Display Icon if provided
-    if icon_path:
-        if os.path.exists(icon_path):
-            try:
-                img = Image.open(icon_path)
-                # Scale icon to a reasonable size
-                img = img.resize((250, 250), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                icon_label = tk.Label(frame, image=photo, bg='#121212')
-                icon_label.image = photo # Keep a reference
-                icon_label.pack(pady=20)
-            except Exception as e:
-                print(f"Error loading icon {icon_path}: {e}")
-        else:
-            print(f"Icon path DOES NOT EXIST: {icon_path}")
-
-
-    title_font = tkfont.Font(family="Segoe UI", size=48, weight="bold")
-    msg_font = tkfont.Font(family="Segoe UI", size=24)
-
-    tk.Label(frame, text=title, font=title_font, fg='#4CAF50', bg='#121212').pack(pady=10)
-    tk.Label(frame, text=message, font=msg_font, fg='white', bg='#121212', wraplength=screen_width-200).pack(pady=10)
-    tk.Label(frame, text="(Click or Press ESC to dismiss)", font=("Segoe UI", 12), fg='#888888', bg='#121212').pack(pady=30)
+    window.configure(bg=bg)
+    return window
+
+def count_widgets(widget):
+    # Total number of Tk widgets below (and including) `widget`
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+class MessageOverlay:
+    # Fullscreen water/meal/work reminder. Built once; each reminder only swaps
+    # the text and icon and maps the window again. on_closed(title,
+    # seconds_on_screen, by_user) reports how each reminder went away.
+    def __init__(self, root, on_hidden=None, on_closed=None):
+        self.root = root
+        self.on_hidden = on_hidden
+        self.on_closed = on_closed
+        self.visible = False
+        self.current = None # (title, message, icon_path, duration_seconds) on screen
+        self._close_id = None
+        self._shown_at = None
+
+        self.window = _fullscreen_window(root, '#121212') # Dark background
+        # Allow clicking to dismiss
+        self.window.bind("<Button-1>", self.hide)
+        self.window.bind("<Escape>", self.hide)
 
-    # Auto close after duration
-    window.after(duration_seconds * 1000, close_window)
+        frame = tk.Frame(self.window, bg='#121212')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
 
-def is_autostart_enabled():
-    app_name = "HealthReminderApp"
-    key = winreg.HKEY_CURRENT_USER
-    key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
-    try:
-        reg_key = winreg.OpenKey(key, key_path, 0, winreg.KEY_READ)
-        winreg.QueryValueEx(reg_key, app_name)
-        winreg.CloseKey(reg_key)
+        self.title_font = tkfont.Font(family="Segoe UI", size=48, weight="bold")
+        self.msg_font = tkfont.Font(family="Segoe UI", size=24)
+
+        self.icon_label = tk.Label(frame, bg='#121212')
+        self.title_label = tk.Label(frame, font=self.title_font, fg='#4CAF50', bg='#121212')
+        self.msg_label = tk.Label(frame, font=self.msg_font, fg='white', bg='#121212',
+                                  wraplength=self.window.winfo_screenwidth()-200)
+        self.hint_label = tk.Label(frame, text="(Click or Press ESC to dismiss)", font=("Segoe UI", 12), fg='#888888', bg='#121212')
+        self.title_label.pack(pady=10)
+        self.msg_label.pack(pady=10)
+        self.hint_label.pack(pady=30)
+
+    def show(self, title, message, icon_path=None, duration_seconds=10):
+        # Play a subtle notification sound (dispatched off the Tk thread)
+        dispatcher.play_sound()
+
+        # Display Icon if provided (scaled once and cached, see assets.IconCache)
+        photo = icon_cache.get(icon_path, MESSAGE_ICON_SIZE) if icon_path else None
+        if photo is not None:
+            self.icon_label.config(image=photo)
+            self.icon_label.image = photo # Keep a reference
+            if not self.icon_label.winfo_manager():
+                self.icon_label.pack(pady=20, before=self.title_label)
+        else:
+            self.icon_label.pack_forget()
+        self.title_label.config(text=title)
+        self.msg_label.config(text=message)
+
+        self.current = (title, message, icon_path, duration_seconds)
+        self.visible = True
+        self._shown_at = time.monotonic()
+        self.window.deiconify()
+        # Ensure it's on top
+        self.window.lift()
+        self.window.focus_force()
+        # Auto close after duration
+        self._close_id = self.window.after(duration_seconds * 1000, self.hide)
+
+    def hide(self, event=None):
+        if not self.visible:
+            return
+        self.visible = False
+        if self._close_id is not None:
+            self.window.after_cancel(self._close_id)
+            self._close_id = None
+        self.window.withdraw()
+        if self.on_closed:
+            # Click/Escape pass an event; the auto-close timer doesn't
+            self.on_closed(self.current[0], time.monotonic() - self._shown_at, event is not None)
+        if self.on_hidden:
+            self.on_hidden()
+
+class RenderStats:
+    # How many Tk updates the timer overlays issued vs. skipped because the
+    # displayed state (text, colour, visibility) had not changed
+    def __init__(self):
+        self.redraws = 0
+        self.skipped = 0
+
+render_stats = RenderStats()
+
+class RenderState:
+    # Last options applied to a widget; config() only reaches Tk on a change
+    def __init__(self, widget):
+        self.widget = widget
+        self.options = {}
+
+    def config(self, **options):
+        if all(self.options.get(k) == v for k, v in options.items()):
+            render_stats.skipped += 1
+            return False
+        self.widget.config(**options)
+        self.options.update(options)
+        render_stats.redraws += 1
         return True
-    except FileNotFoundError:
-        return False
-    except Exception:
-        return False
 
 class PomodoroOverlay:
     def __init__(self, root):
         self.root = root
         self.overlay = tk.Toplevel(self.root)
+        self.visible = True # a new Toplevel is mapped right away
         self.overlay.title("Pomodoro Timer")
         
         # Remove window decorations
@@ -166,6 +183,7 @@ class PomodoroOverlay:
         self.label = tk.Label(self.overlay, text="00:00", font=("Segoe UI", 16, "bold"), 
                              fg="#4CAF50", bg="#212121")
         self.label.pack(expand=True)
+        self.label_state = RenderState(self.label)
         
         self._x = 0
         self._y = 0
@@ -180,47 +198,51 @@ class PomodoroOverlay:
         self.overlay.geometry(f"+{x}+{y}")
 
     def update_timer(self, text, is_work=True):
+        # Nothing to draw while hidden; show() comes first when it reappears
+        if not self.visible:
+            render_stats.skipped += 1
+            return
         color = "#4CAF50" if is_work else "#2196F3" # Green for work, Blue for rest
-        self.label.config(text=text, fg=color)
-        # Removing explicit update() as root.update() in main loop handles it better
+        self.label_state.config(text=text, fg=color)
 
     def show(self):
+        # deiconify()/lift() cost a window-manager round trip, so only on a change
+        if self.visible:
+            render_stats.skipped += 1
+            return
+        self.visible = True
         self.overlay.deiconify()
         self.overlay.lift()
+        render_stats.redraws += 1
 
     def hide(self):
+        if not self.visible:
+            render_stats.skipped += 1
+            return
+        self.visible = False
         self.overlay.withdraw()
+        render_stats.redraws += 1
 
 
 class BreakConfirmationUI:
-    def __init__(self, root, on_start_break, on_remind_later, icon_path=None):
+    def __init__(self, root, on_start_break, on_remind_later, icon_path=None, on_hidden=None):
         self.root = root
         self.on_start_break = on_start_break
         self.on_remind_later = on_remind_later
-        
-        self.window = tk.Toplevel(root)
-        screen_width = self.window.winfo_screenwidth()
-        screen_height = self.window.winfo_screenheight()
-        self.window.geometry(f"{screen_width}x{screen_height}+0+0")
-        self.window.overrideredirect(True)
-        self.window.attributes("-topmost", True)
-        self.window.configure(bg='#121212')
-        
+        self.on_hidden = on_hidden
+        self.icon_path = icon_path
+        self.visible = False
+
+        self.window = _fullscreen_window(root, '#121212')
+
         frame = tk.Frame(self.window, bg='#121212')
         frame.place(relx=0.5, rely=0.5, anchor='center')
 
-        if icon_path and os.path.exists(icon_path):
-            try:
-                img = Image.open(icon_path)
-                img = img.resize((200, 200), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                icon_label = tk.Label(frame, image=photo, bg='#121212')
-                icon_label.image = photo
-                icon_label.pack(pady=10)
-            except Exception: pass
-
-        title_font = tkfont.Font(family="Segoe UI", size=36, weight="bold")
-        tk.Label(frame, text="Work session finished!", font=title_font, fg='#4CAF50', bg='#121212').pack(pady=10)
+        self.icon_label = tk.Label(frame, bg='#121212')
+        self.icon_label.pack(pady=10)
+
+        self.title_font = tkfont.Font(family="Segoe UI", size=36, weight="bold")
+        tk.Label(frame, text="Work session finished!", font=self.title_font, fg='#4CAF50', bg='#121212').pack(pady=10)
         tk.Label(frame, text="Would you like to start your break now?", font=("Segoe UI", 18), fg='white', bg='#121212').pack(pady=20)
 
         btn_frame = tk.Frame(frame, bg='#121212')
@@ -238,32 +260,46 @@ class BreakConfirmationUI:
                                 padx=20, pady=10, relief="flat", cursor="hand2")
         later_btn.pack(side="left", padx=10)
 
+    def show(self):
+        # The icon comes from the shared cache, so this is a lookup after the first time
+        photo = icon_cache.get(self.icon_path, BREAK_ICON_SIZE) if self.icon_path else None
+        if photo is not None:
+            self.icon_label.config(image=photo)
+            self.icon_label.image = photo
+
+        self.visible = True
+        self.window.deiconify()
         self.window.lift()
         self.window.focus_force()
 
+    def hide(self):
+        if not self.visible:
+            return
+        self.visible = False
+        self.window.withdraw()
+        if self.on_hidden:
+            self.on_hidden()
+
     def _start_break(self):
-        self.window.destroy()
+        self.hide()
         self.on_start_break()
 
     def _remind_later(self):
-        self.window.destroy()
+        self.hide()
         self.on_remind_later()
 
 class BreakFullscreenOverlay:
-    def __init__(self, root, on_cancel):
+    def __init__(self, root, on_cancel, on_hidden=None):
         self.root = root
         self.on_cancel = on_cancel
-        self.window = tk.Toplevel(root)
-        screen_width = self.window.winfo_screenwidth()
-        screen_height = self.window.winfo_screenheight()
-        self.window.geometry(f"{screen_width}x{screen_height}+0+0")
-        self.window.overrideredirect(True)
-        self.window.attributes("-topmost", True)
-        self.window.configure(bg='black')
+        self.on_hidden = on_hidden
+        self.visible = False
+        self.window = _fullscreen_window(root, 'black')
         
         self.label = tk.Label(self.window, text="00:00", font=("Segoe UI", 72, "bold"), 
                              fg="white", bg="black")
         self.label.place(relx=0.5, rely=0.5, anchor='center')
+        self.label_state = RenderState(self.label)
         
         # Keep instruction label subtle
         self.info = tk.Label(self.window, text="Taking a break...", font=("Segoe UI", 18), 
@@ -276,18 +312,158 @@ class BreakFullscreenOverlay:
                                      relief="flat", cursor="hand2", activebackground="black", activeforeground="#888888")
         self.cancel_btn.place(relx=0.5, rely=0.9, anchor='center')
 
-        self.window.lift()
-        self.window.focus_force()
-
     def _cancel(self):
         self.close()
         self.on_cancel()
 
+    def show(self):
+        self.visible = True
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_force()
+
     def update_timer(self, text):
-        if self.window.winfo_exists():
-            self.label.config(text=text)
+        if not self.visible:
+            render_stats.skipped += 1
+            return
+        self.label_state.config(text=text)
 
     def close(self):
-        if self.window.winfo_exists():
-            self.window.destroy()
-
+        # Withdrawn rather than destroyed so the next break reuses the window
+        if not self.visible:
+            return
+        self.visible = False
+        self.window.withdraw()
+        if self.on_hidden:
+            self.on_hidden()
+
+
+class OverlayManager:
+    # Owns one reusable window per fullscreen overlay kind, built on first use
+    # (or by warm() once the loop is idle) and kept for the rest of the run.
+    # Only one of them is on screen at a time: reminders that arrive while
+    # another overlay is showing are queued (a reminder already waiting with
+    # the same title is not queued twice), and the break screens take
+    # precedence over messages.
+    message_class = MessageOverlay
+    break_confirm_class = BreakConfirmationUI
+    break_overlay_class = BreakFullscreenOverlay
+
+    def __init__(self, root, on_start_break, on_remind_later, on_cancel_break, break_icon_path=None,
+                 on_message_closed=None):
+        self.root = root
+        self.on_start_break = on_start_break
+        self.on_remind_later = on_remind_later
+        self.on_cancel_break = on_cancel_break
+        self.on_message_closed = on_message_closed
+        self.break_icon_path = break_icon_path
+        self._message = None
+        self._break_confirm = None
+        self._break_overlay = None
+        self._queue = deque()
+        self.shown = 0
+        self.coalesced = 0
+        self.show_latency = deque(maxlen=256) # seconds, most recent shows
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = self.message_class(self.root, on_hidden=self._pump, on_closed=self.on_message_closed)
+        return self._message
+
+    @property
+    def break_confirm(self):
+        if self._break_confirm is None:
+            self._break_confirm = self.break_confirm_class(self.root, self.on_start_break, self.on_remind_later,
+                                                           icon_path=self.break_icon_path, on_hidden=self._pump)
+        return self._break_confirm
+
+    @property
+    def break_overlay(self):
+        if self._break_overlay is None:
+            self._break_overlay = self.break_overlay_class(self.root, on_cancel=self.on_cancel_break, on_hidden=self._pump)
+        return self._break_overlay
+
+    def warm(self, message_icons):
+        # Build the windows and decode/scale the icons up front so the first
+        # overlay doesn't pay for it
+        self.message, self.break_confirm, self.break_overlay
+        icon_cache.warm(message_icons, MESSAGE_ICON_SIZE)
+        if self.break_icon_path:
+            icon_cache.warm([self.break_icon_path], BREAK_ICON_SIZE)
+
+    def busy(self):
+        return any(overlay is not None and overlay.visible
+                   for overlay in (self._message, self._break_confirm, self._break_overlay))
+
+    def show_message(self, title, message, icon_path=None, duration_seconds=10):
+        if any(queued[0] == title for queued in self._queue):
+            self.coalesced += 1
+            return
+        self._queue.append((title, message, icon_path, duration_seconds))
+        self._pump()
+
+    def show_break_confirmation(self):
+        self._preempt_message()
+        self._timed("break_confirm", self.break_confirm.show)
+
+    def show_break(self):
+        self._preempt_message()
+        self._timed("break", self.break_overlay.show)
+
+    def close_break(self):
+        if self._break_overlay is not None:
+            self._break_overlay.close()
+
+    def hide_break_confirmation(self):
+        if self._break_confirm is not None:
+            self._break_confirm.hide()
+
+    def _preempt_message(self):
+        # Put an on-screen message back at the front of the queue
+        if self._message is not None and self._message.visible:
+            # It will be shown again, so this doesn't count as it closing
+            self._queue.appendleft(self.message.current)
+            self.message.on_hidden = self.message.on_closed = None
+            self.message.hide()
+            self.message.on_hidden = self._pump
+            self.message.on_closed = self.on_message_closed
+
+    def _pump(self):
+        if self._queue and not self.busy():
+            self._timed("message", self.message.show, *self._queue.popleft())
+
+    def _timed(self, name, show, *args):
+        start = time.perf_counter()
+        show(*args)
+        # Flush the pending geometry/map requests so the latency covers them
+        self.root.update_idletasks()
+        elapsed = time.perf_counter() - start
+        self.show_latency.append(elapsed)
+        OVERLAY_SHOW_SECONDS.observe(elapsed, name)
+        self.shown += 1
+
+    def stats(self):
+        latencies = sorted(self.show_latency)
+        return {
+            "shown": self.shown,
+            "queued": len(self._queue),
+            "coalesced": self.coalesced,
+            "show_latency_ms_p50": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "show_latency_ms_max": latencies[-1] * 1000 if latencies else 0.0,
+            "widgets": count_widgets(self.root),
+            "timer_redraws": render_stats.redraws,
+            "timer_redraws_skipped": render_stats.skipped,
+        }
+
+
+class TkUI:
+    # Creates the real Tk root and overlays. headless.HeadlessUI provides the
+    # same interface without a display for simulations and benchmarks.
+    PomodoroOverlay = PomodoroOverlay
+    OverlayManager = OverlayManager
+
+    def create_root(self):
+        root = tk.Tk()
+        root.withdraw() # Main root is hidden
+        return root
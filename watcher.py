@@ -0,0 +1,148 @@
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+# inotify flags (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+DEBOUNCE_SECONDS = 0.3
+POLL_MIN_SECONDS = 1.0
+POLL_MAX_SECONDS = 30.0
+
+# path -> file signature right after our own save, so the watcher can tell
+# the app's writes apart from the user's
+_own_writes = {}
+_own_writes_lock = threading.Lock()
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def mark_own_write(path):
+    with _own_writes_lock:
+        _own_writes[os.path.abspath(path)] = file_signature(path)
+
+
+def _is_own_write(path, signature):
+    with _own_writes_lock:
+        return _own_writes.get(os.path.abspath(path)) == signature
+
+
+class ConfigWatcher:
+    # Watches a single file and calls on_change() (from the watcher thread)
+    # once a burst of changes has settled. Uses inotify on Linux, otherwise
+    # polls os.stat with a back-off that resets whenever the file changes.
+    # Changes that match the app's own last write are ignored.
+    def __init__(self, path, on_change, debounce=DEBOUNCE_SECONDS):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.debounce = debounce
+        self._signature = file_signature(self.path)
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = None
+
+    def start(self):
+        inotify_fd = _inotify_watch(os.path.dirname(self.path)) if sys.platform.startswith("linux") else None
+        target = self._run_inotify if inotify_fd is not None else self._run_polling
+        args = (inotify_fd,) if inotify_fd is not None else ()
+        self._thread = threading.Thread(target=target, args=args, name="ConfigWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def _check(self):
+        signature = file_signature(self.path)
+        if signature == self._signature:
+            return
+        self._signature = signature
+        if signature is None or _is_own_write(self.path, signature):
+            return
+        try:
+            self.on_change()
+        except Exception:
+            log.exception("Error handling config change")
+
+    def _run_inotify(self, fd):
+        name = os.fsencode(os.path.basename(self.path))
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd, self._wake_r], [], [])
+                if self._wake_r in ready:
+                    break
+                if not _drain_events(fd, name):
+                    continue
+                # Debounce: wait until the directory has been quiet for a while
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([fd, self._wake_r], [], [], self.debounce)
+                    if not ready or self._wake_r in ready:
+                        break
+                    _drain_events(fd, name)
+                if not self._stop.is_set():
+                    self._check()
+        finally:
+            os.close(fd)
+
+    def _run_polling(self):
+        interval = POLL_MIN_SECONDS
+        while not self._stop.wait(interval):
+            before = self._signature
+            if file_signature(self.path) != before:
+                # Let the burst settle before reading
+                if self._stop.wait(self.debounce):
+                    break
+                self._check()
+                interval = POLL_MIN_SECONDS
+            else:
+                interval = min(interval * 2, POLL_MAX_SECONDS)
+
+
+def _inotify_watch(directory):
+    import ctypes # only needed once the watcher starts, keep it off the startup path
+    import ctypes.util
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def _drain_events(fd, name):
+    # Reads pending inotify events; True if any of them concern `name`
+    data = os.read(fd, 64 * 1024)
+    matched = False
+    offset = 0
+    while offset + _EVENT_HEADER.size <= len(data):
+        _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        if data[offset:offset + length].rstrip(b"\0") == name:
+            matched = True
+        offset += length
+    return matched